@@ -2,31 +2,48 @@
 Data Analysis Agent for processing and analyzing data
 """
 
-import pandas as pd
-from io import StringIO
+import asyncio
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
 
+from core.offload import run_blocking
+from core.process_pool import get_process_pool
+
 class DataAgent:
     def __init__(self):
         self.name = "Data Agent"
         self.description = "Analyzes data, processes CSV files, and provides data insights"
+        # Payloads above this size are analyzed in chunks of chunk_rows rows
+        self.streaming_bytes = int(os.getenv("AGENTBAY_DATA_STREAMING_MB", "32")) * 1024 * 1024
+        self.chunk_rows = int(os.getenv("AGENTBAY_DATA_CHUNK_ROWS", "100000"))
+        self.top_correlations = int(os.getenv("AGENTBAY_DATA_TOP_CORRELATIONS", "20"))
+        self.top_groups = int(os.getenv("AGENTBAY_DATA_TOP_GROUPS", "20"))
+        # Compact dtypes for datasets held in memory (see analytics.dtypes)
+        self.optimize_dtypes = os.getenv("AGENTBAY_DATA_OPTIMIZE_DTYPES", "1") != "0"
+        self.category_ratio = float(os.getenv("AGENTBAY_DATA_CATEGORY_RATIO", "0.5"))
+        self.arrow_strings = os.getenv("AGENTBAY_DATA_ARROW_STRINGS", "0") == "1"
+        # Analysis runs in this many worker processes (0: a thread in this process)
+        self.processes = int(os.getenv("AGENTBAY_DATA_PROCESSES", "2"))
+        self.job_timeout = float(os.getenv("AGENTBAY_DATA_JOB_TIMEOUT", "120"))
+        # Streamed files can be profiled with sketches instead (see analytics.sketches)
+        self.approximate = os.getenv("AGENTBAY_DATA_APPROXIMATE", "0") == "1"
+        self.sketch_k = int(os.getenv("AGENTBAY_DATA_SKETCH_K", "200"))
+        self.hll_precision = int(os.getenv("AGENTBAY_DATA_HLL_PRECISION", "14"))
+        self.sample_rows = int(os.getenv("AGENTBAY_DATA_SAMPLE_ROWS", "1000"))
     
+    def shares_results(self, input_data: Dict[str, Any]) -> bool:
+        """Only plain questions can share a result; an attached dataset changes the answer."""
+        return not (input_data.get("csv_data") or input_data.get("dataset_id"))
+
     async def run_tool(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process data analysis requests"""
         try:
             message = input_data.get("message", "").lower()
             
-            # Check if CSV data is provided
-            csv_data = input_data.get("csv_data")
-            if csv_data:
-                result = self.analyze_csv_data(csv_data, message)
-                return {
-                    "content": result,
-                    "type": "data_analysis",
-                    "source": "DataAgent"
-                }
+            # Check if CSV data (or the handle of a dataset sent earlier) is provided
+            if input_data.get("csv_data") or input_data.get("dataset_id"):
+                return await self._analyze_request(input_data, message)
             
             # Data analysis help
             elif any(keyword in message for keyword in ["analyze data", "data analysis", "csv", "dataset"]):
@@ -85,62 +102,200 @@ What data analysis do you need help with?""",
                 "source": "DataAgent"
             }
     
-    def analyze_csv_data(self, csv_content: str, query: str) -> str:
-        """Analyze CSV data based on user query"""
+    async def _analyze_request(self, input_data: Dict[str, Any], message: str) -> Dict[str, Any]:
+        """
+        Answer a question about the attached CSV, or about a dataset sent
+        earlier and referred to by its dataset_id. The reply carries the
+        dataset_id so follow-up questions can send it instead of the data.
+
+        The data is spooled to a file and analyzed off the event loop, so
+        other requests keep being served while it runs.
+        """
+        from analytics.spool import get_spool
+
+        csv_data = input_data.get("csv_data")
+        dataset_id = input_data.get("dataset_id")
+        spool = get_spool()
         try:
-            # Read CSV data
-            df = pd.read_csv(StringIO(csv_content), encoding='utf-8', na_values=['NA', 'N/A', 'missing'])
-            
+            if csv_data:
+                dataset_id, path = await run_blocking("dataset_spool", spool.write_text, csv_data)
+            else:
+                path = spool.find(dataset_id)
+                if path is None:
+                    return {
+                        "content": "That dataset is no longer loaded. Please send the CSV data again.",
+                        "type": "need_data",
+                        "source": "DataAgent"
+                    }
+            content = await self._run_analysis(str(path), dataset_id, message, input_data.get("streaming"),
+                                               input_data.get("approximate"))
+        except asyncio.TimeoutError:
+            content = (f"The analysis took longer than {self.job_timeout:g} seconds and was stopped. "
+                       "Try a more specific question or a smaller dataset.")
+        except Exception as e:
+            content = f"Error analyzing data: {str(e)}"
+        return {
+            "content": content,
+            "type": "data_analysis",
+            "source": "DataAgent",
+            "dataset_id": dataset_id
+        }
+
+    async def _run_analysis(self, path: str, dataset_id: str, query: str, streaming: Optional[bool],
+                            approximate: Optional[bool] = None) -> str:
+        """
+        Run analyze_file in the data process pool, on the worker that last
+        saw this dataset when possible. A job past job_timeout is stopped by
+        killing its worker. With AGENTBAY_DATA_PROCESSES=0 it runs on a
+        thread instead, where a timed-out job can't be stopped, only abandoned.
+        """
+        if self.processes > 0:
+            pool = get_process_pool("data", self.processes)
+            return await pool.run(analyze_dataset_file, path, dataset_id, query, streaming, approximate,
+                                  timeout=self.job_timeout, affinity=dataset_id)
+        return await asyncio.wait_for(
+            run_blocking("data_analysis", self.analyze_file, path, dataset_id, query, streaming, approximate),
+            self.job_timeout,
+        )
+
+    def analyze_file(self, path: str, dataset_id: str, query: str, streaming: Optional[bool] = None,
+                     approximate: Optional[bool] = None) -> str:
+        """
+        Answer a query about a spooled dataset file (CSV, Parquet or JSONL,
+        see analytics.formats), parsing it only if it isn't cached in this process.
+
+        Approximate mode (approximate=True, or AGENTBAY_DATA_APPROXIMATE=1
+        for files large enough to stream) profiles the file in one pass
+        into bounded-size sketches, which then answer follow-up questions
+        without reading it again. It is cached apart from the exact profile.
+        """
+        from analytics.datasets import get_dataset_cache
+        from analytics.formats import read_chunks, read_frame
+        from analytics.profile import profile_chunks
+
+        large = os.path.getsize(path) > self.streaming_bytes
+        if approximate is None:
+            approximate = self.approximate and streaming is not False and large
+
+        def parse():
+            if approximate or streaming or (streaming is None and large):
+                return profile_chunks(read_chunks(path, self.chunk_rows),
+                                      rescan=lambda: read_chunks(path, self.chunk_rows),
+                                      **(self.sketch_options() if approximate else {}))
+            return self.frame_profile(read_frame(path))
+
+        key = f"{dataset_id}~approx" if approximate else dataset_id
+        cache = get_dataset_cache()
+        answer = self.analyze_profile(cache.get_or_load(key, parse), query)
+        # Answering may have memoized results in the profile
+        cache.remeasure(key)
+        return answer
+
+    def sketch_options(self) -> Dict[str, Any]:
+        """StreamingProfile options for approximate mode."""
+        return {"approximate": True, "sketch_k": self.sketch_k,
+                "hll_precision": self.hll_precision, "sample_rows": self.sample_rows}
+
+    def frame_profile(self, df):
+        """Profile of a freshly read DataFrame, stored with compact dtypes unless AGENTBAY_DATA_OPTIMIZE_DTYPES=0."""
+        from analytics.profile import FrameProfile
+
+        if not self.optimize_dtypes:
+            return FrameProfile(df)
+        from analytics.dtypes import optimize_dtypes
+        from analytics.formats import has_pyarrow
+        df, report = optimize_dtypes(df, self.category_ratio, self.arrow_strings and has_pyarrow())
+        return FrameProfile(df, memory_report=report)
+
+    def analyze_profile(self, profile, query: str) -> str:
+        """Answer a query from a dataset profile (see analytics.profile)."""
+        try:
+            from analytics.groupby import parse_group_by
+
             query_lower = query.lower()
+            note = f"\n\n_{profile.note}_" if profile.note else ""
+            group_by = parse_group_by(query, profile.columns, profile.numeric_columns(), limit=self.top_groups)
+            
+            # Memory footprint per column
+            if 'memory' in query_lower:
+                return self.format_memory_usage(profile)
+            
+            # Group by columns and aggregate
+            elif group_by is not None:
+                return self.format_group_by(profile, group_by)
+            
+            # Distinct values per column (a streamed dataset needs its sketches for these)
+            elif any(word in query_lower for word in ['unique', 'distinct', 'cardinality']):
+                if profile.streaming and not profile.approximate:
+                    return ("**Distinct Values per Column:**\n\n"
+                            "This dataset was analyzed in streaming mode, which doesn't keep distinct counts. "
+                            "Ask again with approximate mode on (`approximate: true`) to estimate them in one pass.")
+                return self.format_distinct_counts(profile)
+            
+            # Random rows from an approximate profile's reservoir; otherwise "show sample data" means the first rows
+            elif profile.approximate and any(word in query_lower for word in ['random', 'sample']):
+                num_rows = 5
+                numbers = re.findall(r'\d+', query)
+                if numbers:
+                    num_rows = min(int(numbers[0]), profile.rows)
+                sample = profile.sample(num_rows)
+                
+                return f"""**{len(sample)} random rows of data:**
+
+{sample.to_string()}
+
+**Dataset Info:**
+• Shape: {profile.rows} rows × {len(profile.columns)} columns{note}"""
             
             # Show first rows
-            if any(word in query_lower for word in ['first', 'rows', 'head', 'show']):
+            elif any(word in query_lower for word in ['first', 'rows', 'head', 'show']):
                 num_rows = 5
                 numbers = re.findall(r'\d+', query)
                 if numbers:
-                    num_rows = min(int(numbers[0]), len(df))
+                    num_rows = min(int(numbers[0]), profile.rows)
+                head = profile.head(num_rows)
                 
-                return f"""**First {num_rows} rows of data:**
+                return f"""**First {len(head)} rows of data:**
 
-{df.head(num_rows).to_string()}
+{head.to_string()}
 
 **Dataset Info:**
-• Shape: {df.shape[0]} rows × {df.shape[1]} columns
-• Columns: {list(df.columns)}"""
+• Shape: {profile.rows} rows × {len(profile.columns)} columns
+• Columns: {profile.columns}"""
             
             # Column information
             elif any(word in query_lower for word in ['columns', 'column names', 'data types']):
+                dtypes = profile.dtypes()
+                null_counts = profile.null_counts()
                 col_info = []
-                for col in df.columns:
-                    dtype = str(df[col].dtype)
-                    null_count = df[col].isnull().sum()
-                    col_info.append(f"• **{col}**: {dtype} ({null_count} null values)")
+                for col in profile.columns:
+                    col_info.append(f"• **{col}**: {dtypes[col]} ({null_counts[col]} null values)")
                 
                 return f"""**Column Information:**
 
-**Total Columns**: {len(df.columns)}
-**Dataset Shape**: {df.shape[0]} rows × {df.shape[1]} columns
+**Total Columns**: {len(profile.columns)}
+**Dataset Shape**: {profile.rows} rows × {len(profile.columns)} columns
 
 **Column Details:**
 {chr(10).join(col_info)}"""
             
             # Summary statistics
             elif any(word in query_lower for word in ['summary', 'statistics', 'describe', 'mean', 'median']):
-                numeric_cols = df.select_dtypes(include=['number']).columns
+                numeric_cols = profile.numeric_columns()
                 if len(numeric_cols) > 0:
-                    summary = df[numeric_cols].describe()
+                    summary = profile.describe()
                     return f"""**Summary Statistics:**
 
-**Numeric Columns**: {list(numeric_cols)}
+**Numeric Columns**: {numeric_cols}
 
-{summary.to_string()}"""
+{summary.to_string()}{note}"""
                 else:
                     return "No numeric columns found for statistical analysis."
             
             # Missing values
             elif any(word in query_lower for word in ['missing', 'null', 'na']):
-                missing_data = df.isnull().sum()
-                missing_percent = (missing_data / len(df)) * 100
+                missing_data = profile.null_counts()
+                missing_percent = (missing_data / profile.rows) * 100
                 
                 missing_info = []
                 for col, count in missing_data.items():
@@ -158,9 +313,9 @@ What data analysis do you need help with?""",
             
             # Correlations
             elif any(word in query_lower for word in ['correlation', 'correlate']):
-                numeric_cols = df.select_dtypes(include=['number']).columns
+                numeric_cols = profile.numeric_columns()
                 if len(numeric_cols) > 1:
-                    corr_matrix = df[numeric_cols].corr()
+                    corr_matrix = profile.corr()
                     return f"""**Correlation Matrix:**
 
 {corr_matrix.to_string()}
@@ -174,13 +329,13 @@ What data analysis do you need help with?""",
             else:
                 return f"""**Data Overview:**
 
-**Dataset Shape**: {df.shape[0]} rows × {df.shape[1]} columns
-**Columns**: {list(df.columns)}
-**Data Types**: {dict(df.dtypes)}
-**Missing Values**: {df.isnull().sum().sum()} total
+**Dataset Shape**: {profile.rows} rows × {len(profile.columns)} columns
+**Columns**: {profile.columns}
+**Data Types**: {profile.dtypes()}
+**Missing Values**: {profile.null_counts().sum()} total
 
 **Sample Data:**
-{df.head(3).to_string()}
+{profile.head(3).to_string()}
 
 **Available Analysis:**
 • "Show me the first 10 rows"
@@ -188,23 +343,99 @@ What data analysis do you need help with?""",
 • "Find missing values"
 • "Show correlations"
 • "Group by [column] and calculate averages"
+• "Show memory usage"
+• "Count distinct values"
+• "Show 10 random rows"
 """
                 
         except Exception as e:
             return f"Error analyzing data: {str(e)}"
     
-    def find_strong_correlations(self, corr_matrix) -> str:
-        """Find strong correlations in the matrix"""
-        strong_corr = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_val = corr_matrix.iloc[i, j]
-                if abs(corr_val) > 0.7:
-                    col1 = corr_matrix.columns[i]
-                    col2 = corr_matrix.columns[j]
-                    strong_corr.append(f"• {col1} ↔ {col2}: {corr_val:.3f}")
+    def format_memory_usage(self, profile) -> str:
+        """Bytes per column as loaded and as held, when dtypes were compacted."""
+        import pandas as pd
+        from analytics.dtypes import format_bytes
+
+        report = profile.memory_report
+        if report is None:
+            usage = profile.column_memory()
+            if usage is None:
+                return f"""**Memory Usage:**
+
+This dataset was analyzed in streaming mode, so its rows aren't held in memory. Its profile takes {format_bytes(profile.memory_bytes())}."""
+            table = pd.DataFrame({"dtype": pd.Series(profile.dtypes()), "bytes": usage.map(format_bytes)})
+            return f"""**Memory Usage:**
+
+{table.to_string()}
+
+**Total**: {format_bytes(usage.sum())}"""
+
+        table = report.copy()
+        for column in ("bytes before", "bytes after"):
+            table[column] = report[column].map(format_bytes)
+        before, after = report["bytes before"].sum(), report["bytes after"].sum()
+        return f"""**Memory Usage** (as loaded → as held):
+
+{table.to_string()}
+
+**Total**: {format_bytes(before)} → {format_bytes(after)} ({before / max(after, 1):.1f}x smaller)"""
+    
+    def format_distinct_counts(self, profile) -> str:
+        """Distinct values per column, with the error bound when they are estimated."""
+        counts, error = profile.distinct_counts()
+        if error is None:
+            lines = [f"• **{column}**: {count:,}" for column, count in counts.items()]
+            footer = ""
+        else:
+            lines = [f"• **{column}**: ≈ {count:,} ± {round(count * error):,}" for column, count in counts.items()]
+            footer = (f"\n\n_Estimated with HyperLogLog sketches, within ±{error:.1%} at 95% confidence "
+                      "(small counts are usually exact)._")
+        return f"""**Distinct Values per Column:**
+
+{chr(10).join(lines)}
+
+**Total Rows**: {profile.rows:,}{footer}"""
+
+    def format_group_by(self, profile, spec) -> str:
+        """Run a group-by (see analytics.groupby) and format its top groups."""
+        top, groups = profile.group_by(spec)
+        aggregations = [f"{column} ({func})" for column, func in spec.aggregations]
+        if spec.size:
+            aggregations.insert(0, "row count")
+        order = "lowest" if spec.ascending else "highest"
+        count = f"{len(top)} of {groups:,} groups" if groups > len(top) else f"{groups:,} group{'s' if groups != 1 else ''}"
         
-        return "\n".join(strong_corr) if strong_corr else "No strong correlations found."
+        return f"""**Grouped by {', '.join(map(str, spec.keys))}:**
+
+**Aggregations**: {', '.join(aggregations)}
+
+{top.to_string()}
+
+_Showing {count}, {order} {spec.sort_by} first._"""
+    
+    def find_strong_correlations(self, corr_matrix, threshold: float = 0.7, limit: Optional[int] = None) -> str:
+        """
+        Find strong correlations in the matrix: pairs above the threshold in
+        absolute value, strongest first, at most `limit` of them
+        (default AGENTBAY_DATA_TOP_CORRELATIONS).
+        """
+        import numpy as np
+
+        limit = self.top_correlations if limit is None else limit
+        values = corr_matrix.to_numpy(dtype=np.float64)
+        # Each pair once: strictly above the diagonal (NaN compares False)
+        rows, cols = np.nonzero(np.triu(np.abs(values) > threshold, k=1))
+        if len(rows) == 0:
+            return "No strong correlations found."
+        strengths = values[rows, cols]
+        order = np.argsort(-np.abs(strengths), kind="stable")
+        shown = order[:limit]
+        
+        names = corr_matrix.columns
+        strong_corr = [f"• {names[rows[k]]} ↔ {names[cols[k]]}: {strengths[k]:.3f}" for k in shown]
+        if len(order) > len(shown):
+            strong_corr.append(f"• ... and {len(order) - len(shown)} more")
+        return "\n".join(strong_corr)
     
     def get_data_analysis_status(self) -> str:
         """Check data analysis capabilities"""
@@ -229,3 +460,9 @@ What data analysis do you need help with?""",
         status += "\n🎉 Data analysis is ready to use!"
         
         return status
+
+
+def analyze_dataset_file(path: str, dataset_id: str, query: str, streaming: Optional[bool] = None,
+                         approximate: Optional[bool] = None) -> str:
+    """Data process pool job: DataAgent.analyze_file in the worker process."""
+    return DataAgent().analyze_file(path, dataset_id, query, streaming, approximate)
@@ -2,15 +2,34 @@
 Finance Agent for stock analysis, crypto prices, and market data
 """
 
-import yfinance as yf
+import asyncio
+import os
+import threading
 import requests
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import json
+from core.cache import TTLCache
+from core.offload import run_blocking
+
+# yf.download keeps its results in module-level state, so overlapping calls
+# would mix up each other's tickers
+_download_lock = threading.Lock()
 
 class FinanceAgent:
     def __init__(self):
         self.name = "Finance Agent"
         self.description = "Provides stock prices, market analysis, crypto data, and financial insights"
+        # Seconds to wait for any single symbol before reporting it unavailable
+        self.quote_timeout = float(os.getenv("AGENTBAY_QUOTE_TIMEOUT", "5"))
+        # Worker threads yfinance may use inside one batched price download
+        self.price_threads = int(os.getenv("AGENTBAY_PRICE_THREADS", "8"))
+        # Seconds a quote stays fresh, per asset class
+        self.quote_ttls = {
+            "crypto": float(os.getenv("AGENTBAY_QUOTE_TTL_CRYPTO", "5")),
+            "equity": float(os.getenv("AGENTBAY_QUOTE_TTL_EQUITY", "15")),
+            "index": float(os.getenv("AGENTBAY_QUOTE_TTL_INDEX", "15")),
+        }
+        self._quotes = TTLCache("finance_quotes", ttl=self.quote_ttls["equity"], max_entries=4096)
     
     async def run_tool(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process finance-related requests"""
@@ -21,7 +40,7 @@ class FinanceAgent:
             if any(keyword in message for keyword in ["stock price", "share price", "stock quote"]):
                 symbol = self.extract_stock_symbol(message)
                 if symbol:
-                    result = self.get_stock_price(symbol)
+                    result = await self.get_stock_price(symbol)
                     return {
                         "content": result,
                         "type": "stock_price",
@@ -32,7 +51,7 @@ class FinanceAgent:
             elif any(keyword in message for keyword in ["crypto", "bitcoin", "ethereum", "btc", "eth"]):
                 symbol = self.extract_crypto_symbol(message)
                 if symbol:
-                    result = self.get_crypto_price(symbol)
+                    result = await self.get_crypto_price(symbol)
                     return {
                         "content": result,
                         "type": "crypto_price",
@@ -41,7 +60,7 @@ class FinanceAgent:
             
             # Market indicators
             elif any(keyword in message for keyword in ["market", "indicators", "economic", "s&p", "dow"]):
-                result = self.get_economic_indicators()
+                result = await self.get_economic_indicators()
                 return {
                     "content": result,
                     "type": "market_indicators",
@@ -53,7 +72,7 @@ class FinanceAgent:
                 # Extract holdings from message if provided
                 holdings = self.extract_holdings(message)
                 if holdings:
-                    result = self.calculate_portfolio_value(holdings)
+                    result = await self.calculate_portfolio_value(holdings)
                     return {
                         "content": result,
                         "type": "portfolio_analysis",
@@ -135,11 +154,83 @@ What financial information would you like to know?""",
             return match.group(1)
         return None
     
-    def get_stock_price(self, symbol: str) -> str:
+    def _fetch_info(self, symbol: str) -> Dict[str, Any]:
+        """Blocking yfinance metadata fetch; always run through the yfinance pool"""
+        import yfinance as yf
+
+        return yf.Ticker(symbol).info
+
+    def _quote_ttl(self, symbol: str) -> float:
+        """Freshness window for a symbol based on its asset class"""
+        if symbol.endswith('-USD'):
+            return self.quote_ttls["crypto"]
+        if symbol.startswith('^') or symbol.endswith('=F'):
+            return self.quote_ttls["index"]
+        return self.quote_ttls["equity"]
+
+    async def get_quote_info(self, symbol: str) -> Dict[str, Any]:
+        """Quote metadata for a symbol; concurrent misses share one upstream fetch"""
+        return await self._quotes.get_or_load(
+            ("info", symbol),
+            lambda: run_blocking("yfinance", self._fetch_info, symbol),
+            ttl=self._quote_ttl(symbol)
+        )
+
+    async def _fetch_info_with_timeout(self, symbol: str) -> Dict[str, Any]:
+        """Fetch one symbol's metadata, giving up after quote_timeout seconds"""
+        return await asyncio.wait_for(self.get_quote_info(symbol), self.quote_timeout)
+
+    def _fetch_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Blocking batched last-price fetch; always run through the yfinance pool.
+        One yf.download call pulls a few days of daily bars for every symbol,
+        using a bounded number of threads. That is far lighter than a full
+        .info metadata fetch per holding.
+        """
+        import yfinance as yf
+
+        with _download_lock:
+            data = yf.download(symbols, period="5d", interval="1d", progress=False,
+                               threads=min(len(symbols), self.price_threads), auto_adjust=False)
+
+        prices: Dict[str, Optional[float]] = {symbol: None for symbol in symbols}
+        if data is None or data.empty or "Close" not in data:
+            return prices
+
+        closes = data["Close"]
+        if closes.ndim == 1:
+            closes = closes.to_frame(symbols[0])
+        last = closes.ffill().iloc[-1]
+        for symbol in symbols:
+            price = last.get(symbol)
+            if price is not None and price == price:  # skip NaN
+                prices[symbol] = float(price)
+        return prices
+
+    async def get_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """Latest price for every symbol; None where no price could be retrieved"""
+        if not symbols:
+            return {}
+
+        async def load(keys: List[Any]) -> Dict[Any, Optional[float]]:
+            prices = await run_blocking("yfinance", self._fetch_prices, [symbol for _, symbol in keys])
+            return {("price", symbol): price for symbol, price in prices.items()}
+
+        try:
+            prices = await asyncio.wait_for(
+                self._quotes.get_many_or_load([("price", symbol) for symbol in symbols], load,
+                                              ttl=self.quote_ttls["equity"]),
+                self.quote_timeout * 2
+            )
+            return {symbol: prices.get(("price", symbol)) for symbol in symbols}
+        except Exception as e:
+            print(f"Batched price fetch failed: {str(e)}")
+            return {symbol: None for symbol in symbols}
+
+    async def get_stock_price(self, symbol: str) -> str:
         """Get current stock price for a given symbol"""
         try:
-            ticker = yf.Ticker(symbol.upper())
-            info = ticker.info
+            info = await self.get_quote_info(symbol.upper())
             
             if 'regularMarketPrice' in info and info['regularMarketPrice']:
                 price = info['regularMarketPrice']
@@ -162,14 +253,13 @@ Volume: {info.get('volume', 'N/A'):,}
         except Exception as e:
             return f"Error retrieving stock price for {symbol}: {str(e)}"
     
-    def get_crypto_price(self, symbol: str) -> str:
+    async def get_crypto_price(self, symbol: str) -> str:
         """Get current cryptocurrency price"""
         try:
             if not symbol.endswith('-USD'):
                 symbol = f"{symbol.upper()}-USD"
             
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = await self.get_quote_info(symbol)
             
             if 'regularMarketPrice' in info and info['regularMarketPrice']:
                 price = info['regularMarketPrice']
@@ -187,7 +277,7 @@ Volume: {info.get('volume', 'N/A'):,}"""
         except Exception as e:
             return f"Error retrieving crypto price: {str(e)}"
     
-    def get_economic_indicators(self) -> str:
+    async def get_economic_indicators(self) -> str:
         """Get key economic indicators"""
         try:
             indicators = {
@@ -201,10 +291,16 @@ Volume: {info.get('volume', 'N/A'):,}"""
             
             result = "**Market Indicators**\n\n"
             
-            for symbol, name in indicators.items():
+            # Fetch every symbol at once; a slow or failing one only affects its own line
+            infos = await asyncio.gather(
+                *(self._fetch_info_with_timeout(symbol) for symbol in indicators),
+                return_exceptions=True
+            )
+            
+            for (symbol, name), info in zip(indicators.items(), infos):
                 try:
-                    ticker = yf.Ticker(symbol)
-                    info = ticker.info
+                    if isinstance(info, BaseException):
+                        raise info
                     
                     if 'regularMarketPrice' in info:
                         price = info['regularMarketPrice']
@@ -221,7 +317,7 @@ Volume: {info.get('volume', 'N/A'):,}"""
         except Exception as e:
             return f"Error retrieving market indicators: {str(e)}"
     
-    def calculate_portfolio_value(self, holdings: str) -> str:
+    async def calculate_portfolio_value(self, holdings: str) -> str:
         """Calculate portfolio value from holdings string"""
         try:
             holdings_dict = {}
@@ -232,18 +328,18 @@ Volume: {info.get('volume', 'N/A'):,}"""
             
             total_value = 0
             portfolio_details = []
+            prices = await self.get_prices(list(holdings_dict))
             
             for symbol, shares in holdings_dict.items():
-                try:
-                    ticker = yf.Ticker(symbol)
-                    price = ticker.info.get('regularMarketPrice', 0)
-                    value = price * shares
-                    total_value += value
-                    
-                    portfolio_details.append(f"• **{symbol}**: {shares} shares @ ${price:.2f} = ${value:,.2f}")
-                    
-                except Exception:
+                price = prices.get(symbol)
+                if price is None:
                     portfolio_details.append(f"• **{symbol}**: Error retrieving data")
+                    continue
+                
+                value = price * shares
+                total_value += value
+                
+                portfolio_details.append(f"• **{symbol}**: {shares} shares @ ${price:.2f} = ${value:,.2f}")
             
             result = f"""**Portfolio Analysis**
 
@@ -2,14 +2,45 @@
 News Agent for searching and analyzing news articles
 """
 
-from duckduckgo_search import DDGS
+import asyncio
+import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from core.cache import TTLCache
+from core.offload import run_blocking
+
+# Fixed category searches that the background refresher keeps warm
+NEWS_CATEGORIES = {
+    "breaking": {
+        "query": "breaking news today", "label": "Breaking News", "title": "Breaking News",
+        "name": "breaking news", "short_name": "breaking news", "time_format": "%Y-%m-%d %H:%M"
+    },
+    "tech": {
+        "query": "technology news today AI startup", "label": "Tech News", "title": "Technology News",
+        "name": "technology news", "short_name": "tech news", "time_format": "%Y-%m-%d"
+    },
+    "business": {
+        "query": "business news today market finance", "label": "Business News", "title": "Business News",
+        "name": "business news", "short_name": "business news", "time_format": "%Y-%m-%d"
+    },
+    "sports": {
+        "query": "sports news today games results", "label": "Sports News", "title": "Sports News",
+        "name": "sports news", "short_name": "sports news", "time_format": "%Y-%m-%d"
+    },
+}
 
 class NewsAgent:
     def __init__(self):
         self.name = "News Agent"
         self.description = "Searches for news articles, breaking news, and current events"
+        # Results are fresh for this long; after that they are served stale for
+        # up to AGENTBAY_NEWS_STALE_SECONDS more while a refresh runs
+        fresh_seconds = float(os.getenv("AGENTBAY_NEWS_FRESH_SECONDS", "300"))
+        stale_seconds = float(os.getenv("AGENTBAY_NEWS_STALE_SECONDS", "1800"))
+        self.refresh_interval = float(os.getenv("AGENTBAY_NEWS_REFRESH_SECONDS", str(fresh_seconds * 0.8)))
+        self._categories = TTLCache("news_categories", ttl=fresh_seconds, stale_ttl=stale_seconds,
+                                    max_entries=len(NEWS_CATEGORIES))
+        self._refresher: Optional[asyncio.Task] = None
     
     async def run_tool(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process news-related requests"""
@@ -18,7 +49,7 @@ class NewsAgent:
             
             # Breaking news
             if any(keyword in message for keyword in ["breaking news", "latest news", "current events"]):
-                result = self.search_breaking_news()
+                result = await self.search_breaking_news()
                 return {
                     "content": result,
                     "type": "breaking_news",
@@ -27,7 +58,7 @@ class NewsAgent:
             
             # Tech news
             elif any(keyword in message for keyword in ["tech news", "technology", "ai news", "startup"]):
-                result = self.search_tech_news()
+                result = await self.search_tech_news()
                 return {
                     "content": result,
                     "type": "tech_news",
@@ -36,7 +67,7 @@ class NewsAgent:
             
             # Business news
             elif any(keyword in message for keyword in ["business news", "finance news", "market news"]):
-                result = self.search_business_news()
+                result = await self.search_business_news()
                 return {
                     "content": result,
                     "type": "business_news",
@@ -45,7 +76,7 @@ class NewsAgent:
             
             # Sports news
             elif any(keyword in message for keyword in ["sports news", "sports", "game", "match"]):
-                result = self.search_sports_news()
+                result = await self.search_sports_news()
                 return {
                     "content": result,
                     "type": "sports_news",
@@ -55,7 +86,7 @@ class NewsAgent:
             # Specific topic search
             elif any(keyword in message for keyword in ["news about", "search news", "find news"]):
                 topic = self.extract_topic(message)
-                result = self.search_news_articles(topic)
+                result = await self.search_news_articles(topic)
                 return {
                     "content": result,
                     "type": "topic_news",
@@ -99,104 +130,90 @@ What news would you like to see?""",
         
         return topic.strip() or "general news"
     
-    def search_news_articles(self, topic: str, max_results: int = 5) -> str:
+    def _search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Blocking DuckDuckGo text search; always run through the duckduckgo pool"""
+        from duckduckgo_search import DDGS
+
+        with DDGS() as ddg:
+            return list(ddg.text(query, max_results=max_results) or [])
+    
+    async def search_news_articles(self, topic: str, max_results: int = 5) -> str:
         """Search for news articles on a topic"""
         try:
-            with DDGS() as ddg:
-                search_query = f"{topic} news {datetime.now().strftime('%Y-%m')}"
-                results = ddg.text(search_query, max_results=max_results)
-                
-                if results:
-                    news_results = []
-                    for i, result in enumerate(results, 1):
-                        news_results.append(f"""**Article {i}:**
+            search_query = f"{topic} news {datetime.now().strftime('%Y-%m')}"
+            results = await run_blocking("duckduckgo", self._search, search_query, max_results)
+            
+            if results:
+                news_results = []
+                for i, result in enumerate(results, 1):
+                    news_results.append(f"""**Article {i}:**
 • **{result.get('title', 'No title')}**
 • Source: {result.get('href', 'No URL')}
 • {result.get('body', 'No summary')[:200]}...""")
-                    
-                    return f"**News about '{topic}'**\n\n" + "\n\n".join(news_results)
-                else:
-                    return f"No recent news found for '{topic}'. Try a different search term."
-                    
+                
+                return f"**News about '{topic}'**\n\n" + "\n\n".join(news_results)
+            else:
+                return f"No recent news found for '{topic}'. Try a different search term."
+                
         except Exception as e:
             return f"Error searching for news: {str(e)}"
     
-    def search_breaking_news(self) -> str:
-        """Search for breaking news"""
+    def _fetch_category(self, category: str) -> Tuple[List[Dict[str, Any]], datetime]:
+        """Blocking search for one fixed category, stamped with the fetch time"""
+        return self._search(NEWS_CATEGORIES[category]["query"], 5), datetime.now()
+    
+    async def _category_news(self, category: str) -> str:
+        """Serve a fixed news category from memory, searching only on a cold miss"""
+        spec = NEWS_CATEGORIES[category]
         try:
-            with DDGS() as ddg:
-                results = ddg.text("breaking news today", max_results=5)
-                
-                if results:
-                    news_results = []
-                    for i, result in enumerate(results, 1):
-                        news_results.append(f"""**Breaking News {i}:**
+            self.start_background_tasks()
+            results, fetched_at = await self._categories.get_or_load(
+                category, lambda: run_blocking("duckduckgo", self._fetch_category, category)
+            )
+            
+            if results:
+                news_results = []
+                for i, result in enumerate(results, 1):
+                    news_results.append(f"""**{spec['label']} {i}:**
 • **{result.get('title', 'No title')}**
 • {result.get('body', 'No summary')[:200]}...""")
-                    
-                    return f"**Breaking News - {datetime.now().strftime('%Y-%m-%d %H:%M')}**\n\n" + "\n\n".join(news_results)
-                else:
-                    return "No breaking news found at the moment."
-                    
+                
+                return f"**{spec['title']} - {fetched_at.strftime(spec['time_format'])}**\n\n" + "\n\n".join(news_results)
+            else:
+                return f"No {spec['name']} found at the moment."
+                
         except Exception as e:
-            return f"Error searching for breaking news: {str(e)}"
+            return f"Error searching for {spec['short_name']}: {str(e)}"
+    
+    async def search_breaking_news(self) -> str:
+        """Search for breaking news"""
+        return await self._category_news("breaking")
     
-    def search_tech_news(self) -> str:
+    async def search_tech_news(self) -> str:
         """Search for technology news"""
-        try:
-            with DDGS() as ddg:
-                results = ddg.text("technology news today AI startup", max_results=5)
-                
-                if results:
-                    news_results = []
-                    for i, result in enumerate(results, 1):
-                        news_results.append(f"""**Tech News {i}:**
-• **{result.get('title', 'No title')}**
-• {result.get('body', 'No summary')[:200]}...""")
-                    
-                    return f"**Technology News - {datetime.now().strftime('%Y-%m-%d')}**\n\n" + "\n\n".join(news_results)
-                else:
-                    return "No technology news found at the moment."
-                    
-        except Exception as e:
-            return f"Error searching for tech news: {str(e)}"
+        return await self._category_news("tech")
     
-    def search_business_news(self) -> str:
+    async def search_business_news(self) -> str:
         """Search for business news"""
-        try:
-            with DDGS() as ddg:
-                results = ddg.text("business news today market finance", max_results=5)
-                
-                if results:
-                    news_results = []
-                    for i, result in enumerate(results, 1):
-                        news_results.append(f"""**Business News {i}:**
-• **{result.get('title', 'No title')}**
-• {result.get('body', 'No summary')[:200]}...""")
-                    
-                    return f"**Business News - {datetime.now().strftime('%Y-%m-%d')}**\n\n" + "\n\n".join(news_results)
-                else:
-                    return "No business news found at the moment."
-                    
-        except Exception as e:
-            return f"Error searching for business news: {str(e)}"
+        return await self._category_news("business")
     
-    def search_sports_news(self) -> str:
+    async def search_sports_news(self) -> str:
         """Search for sports news"""
-        try:
-            with DDGS() as ddg:
-                results = ddg.text("sports news today games results", max_results=5)
-                
-                if results:
-                    news_results = []
-                    for i, result in enumerate(results, 1):
-                        news_results.append(f"""**Sports News {i}:**
-• **{result.get('title', 'No title')}**
-• {result.get('body', 'No summary')[:200]}...""")
-                    
-                    return f"**Sports News - {datetime.now().strftime('%Y-%m-%d')}**\n\n" + "\n\n".join(news_results)
-                else:
-                    return "No sports news found at the moment."
-                    
-        except Exception as e:
-            return f"Error searching for sports news: {str(e)}"
+        return await self._category_news("sports")
+    
+    def start_background_tasks(self) -> None:
+        """Start the category refresher; must be called from the event loop"""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_categories())
+    
+    async def _refresh_categories(self) -> None:
+        """Keep every fixed category warm so requests never wait on DuckDuckGo"""
+        while True:
+            for category in NEWS_CATEGORIES:
+                try:
+                    await self._categories.refresh(
+                        category, lambda c=category: run_blocking("duckduckgo", self._fetch_category, c)
+                    )
+                except Exception as e:
+                    print(f"Error refreshing {category} news: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
@@ -1,9 +1,15 @@
 import os
 import asyncio
-from typing import Dict, Any, Optional
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 import re
 import json
+from core.cache import TTLCache
+from core.llm_cache import CachedChatModel
+from core.llm_gateway import chat_model
+
+MATH_FALLBACK = "I can help with calculations! Could you please rephrase your math question more clearly? For example: 'Calculate 15% of 200' or 'Solve: 2x + 5 = 15'"
+GENERAL_QUESTION_FALLBACK = "I'd be happy to help answer your question! Could you please provide a bit more context or rephrase it?"
+TRAVEL_HELP_FALLBACK = "I'm here to help you plan amazing trips! Try asking me to plan a trip to a specific destination, like 'Plan a 5-day trip to Tokyo' or 'Create an itinerary for Paris'."
 
 class TravelAgent:
     """
@@ -13,9 +19,18 @@ class TravelAgent:
     """
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
-        self._cache = {}  # Cache for processed requests
-        
+        self.llm = CachedChatModel(chat_model("gpt-3.5-turbo", temperature=0.7))
+        # Research depends only on destination and duration, so it is kept for a long time
+        self._research = TTLCache(
+            "travel_research",
+            ttl=float(os.getenv("AGENTBAY_TRAVEL_RESEARCH_TTL", "86400")),
+            max_entries=int(os.getenv("AGENTBAY_TRAVEL_RESEARCH_MAX_ENTRIES", "512")),
+        )
+        # Opt-in: trips longer than this are planned in day blocks generated concurrently (0 disables).
+        # Every part resends the research, so this trades several times the tokens for latency.
+        self.day_block_days = int(os.getenv("AGENTBAY_TRAVEL_DAY_BLOCK_DAYS", "0"))
+        self.itinerary_concurrency = int(os.getenv("AGENTBAY_TRAVEL_ITINERARY_CONCURRENCY", "6"))
+
     def _extract_travel_info(self, message: str) -> Dict[str, Any]:
         """Extract destination and duration from user message."""
         # Look for destination patterns
@@ -34,9 +49,9 @@ class TravelAgent:
         
         # Look for duration patterns
         duration_patterns = [
-            r'(\d+)\s*(?:days?|day)',
+            r'(\d+)[\s-]*(?:days?|day)',
             r'for\s+(\d+)',
-            r'(\d+)\s*(?:nights?|night)',
+            r'(\d+)[\s-]*(?:nights?|night)',
         ]
         
         duration = 7  # default
@@ -110,9 +125,8 @@ If you're asking about a YouTube video or media content, you might want to:
 
 Would you like help with travel planning instead, or do you have a different question I can assist with?"""
     
-    async def _research_destination(self, destination: str, duration: int) -> str:
-        """Research a destination and gather travel information."""
-        prompt = f"""
+    def _research_prompt(self, destination: str, duration: int) -> str:
+        return f"""
         Research the destination "{destination}" for a {duration}-day trip.
         
         Provide comprehensive information about:
@@ -129,17 +143,27 @@ Would you like help with travel planning instead, or do you have a different que
         
         Format the response as detailed research findings that can be used to create an itinerary.
         """
-        
-        try:
+    
+    def _research_key(self, destination: str, duration: int) -> Tuple[str, int]:
+        """'Tokyo', ' tokyo ' and 'TOKYO,' share one research entry."""
+        return " ".join(destination.lower().split()).strip(" ,."), duration
+
+    async def _research_destination(self, destination: str, duration: int) -> str:
+        """Research a destination and gather travel information."""
+        prompt = self._research_prompt(destination, duration)
+
+        async def research() -> str:
             response = await self.llm.ainvoke(prompt)
             return response.content
+        
+        try:
+            return await self._research.get_or_load(self._research_key(destination, duration), research)
         except Exception as e:
             print(f"Error researching destination: {str(e)}")
             return f"Error researching {destination}: {str(e)}"
     
-    async def _create_itinerary(self, destination: str, duration: int, research: str) -> str:
-        """Create a detailed itinerary based on research."""
-        prompt = f"""
+    def _itinerary_prompt(self, destination: str, duration: int, research: str) -> str:
+        return f"""
         Based on the following research, create a detailed {duration}-day itinerary for {destination}.
         
         Research Information:
@@ -182,6 +206,18 @@ Would you like help with travel planning instead, or do you have a different que
         
         Make the itinerary engaging, practical, and well-organized with specific recommendations.
         """
+    
+    async def _create_itinerary(self, destination: str, duration: int, research: str) -> str:
+        """Create a detailed itinerary based on research."""
+        if self._plans_in_blocks(duration):
+            sections = self._itinerary_sections(destination, duration, research)
+            try:
+                return self._itinerary_title(destination, duration) + "".join(await asyncio.gather(*sections))
+            finally:
+                for section in sections:
+                    section.cancel()
+
+        prompt = self._itinerary_prompt(destination, duration, research)
         
         try:
             response = await self.llm.ainvoke(prompt)
@@ -189,10 +225,138 @@ Would you like help with travel planning instead, or do you have a different que
         except Exception as e:
             print(f"Error creating itinerary: {str(e)}")
             return f"Error creating itinerary: {str(e)}"
+
+    def _plans_in_blocks(self, duration: int) -> bool:
+        return 0 < self.day_block_days < duration
+
+    def _itinerary_title(self, destination: str, duration: int) -> str:
+        return f"**{duration}-Day {destination} Itinerary**\n\n"
+
+    def _day_blocks(self, duration: int) -> List[Tuple[int, int]]:
+        """First and last day of each block, e.g. 7 days in blocks of 3 -> (1, 3), (4, 6), (7, 7)."""
+        size = self.day_block_days
+        return [(first, min(first + size - 1, duration)) for first in range(1, duration + 1, size)]
+
+    def _overview_prompt(self, destination: str, duration: int, research: str) -> str:
+        return f"""
+        Based on the following research, write the opening of a {duration}-day itinerary for {destination}.
+        
+        Research Information:
+        {research}
+        
+        Write only these sections, with no detailed day-by-day plan:
+        
+        **Trip Overview:**
+        [Brief overview of the trip: its pace, the areas it covers and what makes it special]
+        
+        **Daily Highlights:**
+        Day 1: [The main sights and areas for day 1]
+        [One line like this for each of the {duration} days. Never give the same sight to two days.]
+        """
+
+    def _daily_highlights(self, overview: str) -> Dict[int, str]:
+        """The "Day N: ..." lines of an overview, by day."""
+        return {
+            int(day): text.strip(" *")
+            for day, text in re.findall(r"^\W*Day\s+(\d+)\W*?[:\-–]\s*(.+)$", overview, re.MULTILINE)
+        }
+
+    def _day_block_prompt(self, destination: str, duration: int, research: str, first: int, last: int,
+                          highlights: Dict[int, str]) -> str:
+        days = f"Day {first}" if first == last else f"Days {first}-{last}"
+        plan = ""
+        if highlights:
+            mine = "\n".join(f"        Day {day}: {text}" for day, text in sorted(highlights.items()) if first <= day <= last)
+            others = "\n".join(f"        Day {day}: {text}" for day, text in sorted(highlights.items()) if not first <= day <= last)
+            plan = f"""
+        Build these days around their highlights from the trip plan:
+{mine}
+        
+        These belong to other days, so don't schedule them again:
+{others}
+        """
+        return f"""
+        Based on the following research, plan {days} of a {duration}-day trip to {destination}.
+        The other days are planned separately, so plan only these days. Suit them to their place
+        in the trip: arrival and settling in at the start, departure on day {duration}, and the
+        main sights spread across the middle.
+        {plan}
+        Research Information:
+        {research}
+        
+        Use exactly this format for each day:
+        
+        **Day N: [Theme/Focus]**
+        • Morning: [Activity with time and details]
+        • Afternoon: [Activity with time and details]  
+        • Evening: [Activity with time and details]
+        • Accommodation: [Recommendation]
+        • Dining: [Restaurant recommendations]
+        """
+
+    def _trip_notes_prompt(self, destination: str, duration: int, research: str) -> str:
+        return f"""
+        Based on the following research, write the closing sections of a {duration}-day itinerary for {destination}.
+        
+        Research Information:
+        {research}
+        
+        Write only these sections:
+        
+        **Budget Estimate:**
+        • Accommodation: $X - $Y per night
+        • Food: $X - $Y per day
+        • Activities: $X - $Y total
+        • Transportation: $X - $Y
+        • **Total Estimated Cost: $X - $Y**
+        
+        **Travel Tips:**
+        • [Important tip 1]
+        • [Important tip 2]
+        • [Important tip 3]
+        
+        **Packing Essentials:**
+        • [Essential item 1]
+        • [Essential item 2]
+        • [Essential item 3]
+        """
+
+    def _itinerary_sections(self, destination: str, duration: int, research: str) -> List[asyncio.Task]:
+        """
+        Start every part of a long itinerary: overview, one block per few
+        days, then budget and tips. The overview assigns each day its
+        highlights, and the blocks wait for it so no sight is planned twice;
+        the blocks then run concurrently, alongside budget and tips. After
+        the title, the tasks' text joins into the full itinerary in list
+        order, so the caller can emit each part as soon as it and everything
+        before it is ready.
+        """
+        semaphore = asyncio.Semaphore(self.itinerary_concurrency)
+
+        async def section(prompt: str, prefix: str) -> str:
+            async with semaphore:
+                try:
+                    response = await self.llm.ainvoke(prompt)
+                    return prefix + response.content.strip() + "\n\n"
+                except Exception as e:
+                    print(f"Error creating itinerary: {str(e)}")
+                    return prefix + f"Error creating itinerary: {str(e)}\n\n"
+
+        async def block(first: int, last: int, prefix: str) -> str:
+            # Shielded: cancelling one block must not cancel the overview the others wait on
+            highlights = self._daily_highlights(await asyncio.shield(overview))
+            return await section(self._day_block_prompt(destination, duration, research, first, last, highlights), prefix)
+
+        overview = asyncio.ensure_future(section(self._overview_prompt(destination, duration, research), ""))
+        blocks = [
+            asyncio.ensure_future(block(first, last, "**Day-by-Day Plan:**\n\n" if i == 0 else ""))
+            for i, (first, last) in enumerate(self._day_blocks(duration))
+        ]
+        notes = asyncio.ensure_future(section(self._trip_notes_prompt(destination, duration, research), ""))
+        return [overview, *blocks, notes]
     
-    async def _handle_math_calculation(self, message: str) -> str:
-        """Handle mathematical calculations and problems."""
-        prompt = f"""
+    def _math_prompt(self, message: str) -> str:
+        return f"""
         The user has a mathematical question or calculation request: "{message}"
         
         Please:
@@ -203,32 +367,38 @@ Would you like help with travel planning instead, or do you have a different que
         
         Be clear and educational in your response.
         """
+    
+    async def _handle_math_calculation(self, message: str) -> str:
+        """Handle mathematical calculations and problems."""
+        prompt = self._math_prompt(message)
         
         try:
-            response = await self.llm.ainvoke(prompt)
+            response = await self.llm.ainvoke(prompt, cache=False)
             return response.content
         except Exception as e:
-            return f"I can help with calculations! Could you please rephrase your math question more clearly? For example: 'Calculate 15% of 200' or 'Solve: 2x + 5 = 15'"
+            return MATH_FALLBACK
     
-    async def _handle_general_question(self, message: str) -> str:
-        """Handle general knowledge questions."""
-        prompt = f"""
+    def _general_question_prompt(self, message: str) -> str:
+        return f"""
         The user has a general question: "{message}"
         
         Please provide a helpful, accurate, and informative response. 
         If you're not certain about specific facts, mention that.
         Keep the response conversational and helpful.
         """
+    
+    async def _handle_general_question(self, message: str) -> str:
+        """Handle general knowledge questions."""
+        prompt = self._general_question_prompt(message)
         
         try:
-            response = await self.llm.ainvoke(prompt)
+            response = await self.llm.ainvoke(prompt, cache=False)
             return response.content
         except Exception as e:
-            return f"I'd be happy to help answer your question! Could you please provide a bit more context or rephrase it?"
+            return GENERAL_QUESTION_FALLBACK
     
-    async def _provide_travel_help(self, message: str) -> str:
-        """Provide general travel assistance."""
-        prompt = f"""
+    def _travel_help_prompt(self, message: str) -> str:
+        return f"""
         You are a helpful travel assistant. The user asked: "{message}"
         
         Provide helpful travel advice, tips, or information related to their question.
@@ -244,12 +414,26 @@ Would you like help with travel planning instead, or do you have a different que
         - "Create an itinerary for Paris for 3 days"
         - "I want to visit Thailand for a week"
         """
+    
+    async def _provide_travel_help(self, message: str) -> str:
+        """Provide general travel assistance."""
+        prompt = self._travel_help_prompt(message)
         
         try:
-            response = await self.llm.ainvoke(prompt)
+            response = await self.llm.ainvoke(prompt, cache=False)
             return response.content
         except Exception as e:
-            return f"I'm here to help you plan amazing trips! Try asking me to plan a trip to a specific destination, like 'Plan a 5-day trip to Tokyo' or 'Create an itinerary for Paris'."
+            return TRAVEL_HELP_FALLBACK
+    
+    async def _stream(self, prompt: str, fallback: str, cache: bool = True) -> AsyncIterator[str]:
+        """Stream a prompt's completion token by token, yielding fallback text on failure."""
+        try:
+            async for chunk in self.llm.astream(prompt, cache=cache):
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            print(f"Error streaming response: {str(e)}")
+            yield fallback
     
     async def run_tool(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Main method to process travel requests."""
@@ -333,6 +517,78 @@ Would you like help with travel planning instead, or do you have a different que
                 "source": "TravelAgent"
             }
     
+    async def stream_tool(self, input_data: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Streaming variant of run_tool.
+        Yields text chunks as the LLM produces them, then one final result dict
+        with type and source (and content, when nothing was streamed).
+        """
+        try:
+            message = input_data.get("message", "")
+            
+            print(f"Streaming travel/general request: {message}")
+            
+            # Fixed replies don't need the LLM, so they come back as one result
+            if self._is_video_related_but_misrouted(message):
+                yield await self.run_tool(input_data)
+                return
+
+            intent = self._detect_intent(message)
+
+            if intent != "plan_trip":
+                if intent == "math_calculation":
+                    prompt, fallback, result_type = self._math_prompt(message), MATH_FALLBACK, "math_calculation"
+                elif intent == "general_question":
+                    prompt, fallback, result_type = self._general_question_prompt(message), GENERAL_QUESTION_FALLBACK, "general_question"
+                else:
+                    prompt, fallback, result_type = self._travel_help_prompt(message), TRAVEL_HELP_FALLBACK, "travel_help"
+                # These prompts quote the user's message, so never share answers
+                async for chunk in self._stream(prompt, fallback, cache=False):
+                    yield chunk
+                yield {"type": result_type, "source": "TravelAgent"}
+                return
+            
+            travel_info = self._extract_travel_info(message)
+            destination = travel_info["destination"]
+            duration = travel_info["duration"]
+            
+            if not destination:
+                yield await self.run_tool(input_data)
+                return
+            
+            print(f"Planning trip to {destination} for {duration} days")
+            
+            # Research is an input to the itinerary, so only the itinerary streams
+            research = await self._research_destination(destination, duration)
+            if self._plans_in_blocks(duration):
+                sections = self._itinerary_sections(destination, duration, research)
+                yield self._itinerary_title(destination, duration)
+                try:
+                    for section in sections:
+                        yield await section
+                finally:
+                    for section in sections:
+                        section.cancel()
+            else:
+                async for chunk in self._stream(self._itinerary_prompt(destination, duration, research),
+                                                "Error creating itinerary"):
+                    yield chunk
+            
+            yield {
+                "type": "itinerary",
+                "source": "TravelAgent",
+                "destination": destination,
+                "duration": duration
+            }
+                
+        except Exception as e:
+            print(f"Error processing request: {str(e)}")
+            yield {
+                "type": "error",
+                "content": "I apologize, but I encountered an issue. Please try rephrasing your request!",
+                "source": "TravelAgent"
+            }
+    
     async def __call__(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Allow the agent to be called directly."""
         return await self.run_tool(input_data)
@@ -1,10 +1,13 @@
 import os
 import asyncio
 from typing import Dict, Any, Optional
-from youtube_transcript_api import YouTubeTranscriptApi
-from langchain_openai import ChatOpenAI
 import re
 from urllib.parse import urlparse, parse_qs
+from core.llm_cache import CachedChatModel
+from core.llm_gateway import chat_model
+from core.offload import run_blocking
+from core.summarize import get_summarizer
+from core.transcripts import get_transcript_store
 
 class TutorAgent:
     """
@@ -13,9 +16,10 @@ class TutorAgent:
     """
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
-        self._video_cache = {}  # Simple in-memory cache for processed videos
-        
+        self.llm = CachedChatModel(chat_model("gpt-3.5-turbo", temperature=0.7))
+        self._transcripts = get_transcript_store()  # Shared with YouTubeAgent
+        self._summarizer = get_summarizer()
+
     def _extract_video_id(self, youtube_url: str) -> Optional[str]:
         """Extract video ID from various YouTube URL formats."""
         patterns = [
@@ -31,6 +35,8 @@ class TutorAgent:
     
     def _get_transcript(self, video_id: str) -> str:
         """Get transcript for a YouTube video using updated API."""
+        from youtube_transcript_api import YouTubeTranscriptApi
+
         try:
             # Try multiple approaches to get transcript
             transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
@@ -78,23 +84,26 @@ class TutorAgent:
         if not transcript:
             return "Unable to generate summary - transcript not available."
             
-        # Limit transcript length to avoid token limits
-        max_length = 4000
-        if len(transcript) > max_length:
-            transcript = transcript[:max_length] + "..."
-            
-        prompt = f"""
-        Please provide a comprehensive summary of the following video transcript. 
-        Focus on the main topics, key points, and important insights discussed.
-        Structure your summary with clear sections and bullet points where appropriate.
-        
-        Transcript:
-        {transcript}
-        
-        Summary:
-        """
-        
         try:
+            # Long transcripts are summarized per segment, then merged
+            if self._summarizer.needs_map(transcript):
+                partials = await self._summarizer.summarize_segments(self.llm, transcript)
+                source = "summaries of consecutive parts of the video, in order"
+                transcript = "\n\n".join(partials)
+            else:
+                source = "video transcript"
+
+            prompt = f"""
+            Please provide a comprehensive summary of the following {source}. 
+            Focus on the main topics, key points, and important insights discussed.
+            Structure your summary with clear sections and bullet points where appropriate.
+            
+            Transcript:
+            {transcript}
+            
+            Summary:
+            """
+            
             response = await self.llm.ainvoke(prompt)
             return response.content
         except Exception as e:
@@ -124,7 +133,7 @@ class TutorAgent:
         """
         
         try:
-            response = await self.llm.ainvoke(prompt)
+            response = await self.llm.ainvoke(prompt, cache=False)
             return response.content
         except Exception as e:
             print(f"Error answering question: {str(e)}")
@@ -158,7 +167,7 @@ class TutorAgent:
             """
         
         try:
-            response = await self.llm.ainvoke(prompt)
+            response = await self.llm.ainvoke(prompt, cache=False)
             return response.content
         except Exception as e:
             return f"Unable to process this YouTube video due to access restrictions. Please try a different video or provide the transcript directly."
@@ -188,7 +197,9 @@ class TutorAgent:
             print(f"Extracted video ID: {video_id}")
             
             # Try to get transcript
-            transcript = self._get_transcript(video_id)
+            transcript = await self._transcripts.get_or_fetch(
+                video_id, lambda: run_blocking("youtube_transcript", self._get_transcript, video_id)
+            )
             
             if transcript:
                 print(f"Retrieved transcript length: {len(transcript)} characters")
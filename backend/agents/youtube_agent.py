@@ -1,14 +1,13 @@
 import os
-from typing import Dict, Any, Optional
-from youtube_transcript_api import (
-    YouTubeTranscriptApi,
-    TranscriptsDisabled,
-    NoTranscriptFound,
-    VideoUnavailable,
-    CouldNotRetrieveTranscript
-)
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 import re
+from core.llm_cache import CachedChatModel
+from core.llm_gateway import chat_model
+from core.offload import run_blocking
+from core.retrieval import get_retriever
+from core.sessions import DEFAULT_SESSION, SessionStore
+from core.summarize import get_summarizer
+from core.transcripts import get_transcript_store
 
 class YouTubeAgent:
     """
@@ -17,8 +16,17 @@ class YouTubeAgent:
     """
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
-        self._video_cache = {}  # Cache for processed videos
+        self.llm = CachedChatModel(chat_model("gpt-3.5-turbo", temperature=0.7))
+        # Each session's active video ({"video_id", "url"}); idle sessions are dropped
+        self._videos = SessionStore(
+            "youtube_videos",
+            idle_timeout=float(os.getenv("AGENTBAY_SESSION_IDLE_SECONDS", "1800")),
+            max_sessions=int(os.getenv("AGENTBAY_SESSION_MAX", "10000")),
+        )
+        self._transcripts = get_transcript_store()
+        self._retriever = get_retriever()
+        self._summarizer = get_summarizer()
+        self.context_chars = int(os.getenv("AGENTBAY_YOUTUBE_CONTEXT_CHARS", "3500"))
 
     def _extract_video_id(self, youtube_url: str) -> Optional[str]:
         """Extract video ID from various YouTube URL formats."""
@@ -34,6 +42,13 @@ class YouTubeAgent:
 
     def _get_transcript(self, video_id: str) -> Optional[str]:
         """Get transcript for a YouTube video."""
+        from youtube_transcript_api import (
+            YouTubeTranscriptApi,
+            TranscriptsDisabled,
+            NoTranscriptFound,
+            VideoUnavailable,
+            CouldNotRetrieveTranscript
+        )
         try:
             transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
             transcript_data = None
@@ -72,6 +87,12 @@ class YouTubeAgent:
             print(f"❌ Unexpected error while fetching transcript: {str(e)}")
             return None
 
+    async def _fetch_transcript(self, video_id: str) -> Optional[str]:
+        """Transcript from the shared store, downloading it only on a miss."""
+        return await self._transcripts.get_or_fetch(
+            video_id, lambda: run_blocking("youtube_transcript", self._get_transcript, video_id)
+        )
+
     def _detect_intent(self, message: str, has_video: bool) -> str:
         message_lower = message.lower()
         if self._extract_video_id(message):
@@ -99,34 +120,59 @@ class YouTubeAgent:
         is_personal_question = any(keyword in question_lower for keyword in personal_info_keywords)
         if is_personal_question:
             question_keywords = question_lower.split()
-            relevant_keywords = sum(1 for kw in question_keywords if kw in transcript.lower() and len(kw) > 3)
+            transcript_lower = transcript.lower()
+            relevant_keywords = sum(1 for kw in question_keywords if kw in transcript_lower and len(kw) > 3)
             if len(question_keywords) > 0 and relevant_keywords / len(question_keywords) < 0.3:
                 return False
         return True
 
-    async def _process_new_video(self, youtube_url: str) -> Dict[str, Any]:
+    async def _load_video(self, youtube_url: str, session_id: str) -> Dict[str, Any]:
+        """Fetch a new video's transcript and make it the session's active video, or return an error result."""
         video_id = self._extract_video_id(youtube_url)
         if not video_id:
             return {"type": "error", "content": "Invalid YouTube URL.", "source": "YouTubeAgent"}
         print(f"Processing new video: {video_id}")
-        transcript = self._get_transcript(video_id)
+        transcript = await self._fetch_transcript(video_id)
         if not transcript:
             return {"type": "error", "content": "Sorry, I couldn't access the transcript for this video.", "source": "YouTubeAgent"}
-        self._video_cache[video_id] = {"url": youtube_url, "transcript": transcript}
-        summary = await self._generate_summary(transcript)
+        self._videos.set(session_id, {"video_id": video_id, "url": youtube_url})
+        return {"video_id": video_id, "transcript": transcript}
+
+    async def _process_new_video(self, youtube_url: str, session_id: str) -> Dict[str, Any]:
+        video = await self._load_video(youtube_url, session_id)
+        if "transcript" not in video:
+            return video
+        summary = await self._generate_summary(video["transcript"])
         return {
             "type": "video_summary",
             "content": f"Video Analysis Complete!\n\n{summary}",
             "source": "YouTubeAgent",
-            "video_id": video_id
+            "video_id": video["video_id"]
         }
 
-    async def _generate_summary(self, transcript: str) -> str:
-        if len(transcript) > 4000:
-            transcript = transcript[:4000] + "..."
-        prompt = f"""Analyze this YouTube transcript and provide a comprehensive summary.
-        
-**Main Topic:**
+    def _relevant_context(self, transcript: str, query: str) -> str:
+        """The transcript passages most relevant to the query, from anywhere in the video."""
+        return self._retriever.context(transcript, query, self.context_chars)
+
+    async def _complete(self, prompt: str, error_label: str, cache: bool = True) -> str:
+        """Run a prompt through the LLM, reporting failures as text.
+        Pass cache=False when the prompt carries the user's own words."""
+        try:
+            response = await self.llm.ainvoke(prompt, cache=cache)
+            return response.content
+        except Exception as e:
+            return f"{error_label}: {str(e)}"
+
+    async def _stream(self, prompt: str, error_label: str, cache: bool = True) -> AsyncIterator[str]:
+        """Stream a prompt's completion token by token, reporting failures as text."""
+        try:
+            async for chunk in self.llm.astream(prompt, cache=cache):
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            yield f"{error_label}: {str(e)}"
+
+    SUMMARY_FORMAT = """**Main Topic:**
 [Brief description]
 
 **Key Points:**
@@ -137,21 +183,39 @@ class YouTubeAgent:
 [Insights]
 
 **Content Overview:**
-[Structure overview]
+[Structure overview]"""
+
+    def _summary_prompt(self, transcript: str) -> str:
+        return f"""Analyze this YouTube transcript and provide a comprehensive summary.
+        
+{self.SUMMARY_FORMAT}
 
 Transcript:
 {transcript}
 """
-        try:
-            response = await self.llm.ainvoke(prompt)
-            return response.content
-        except Exception as e:
-            return f"Error generating summary: {str(e)}"
 
-    async def _generate_quiz(self, transcript: str, user_message: str) -> str:
-        if len(transcript) > 3500:
-            transcript = transcript[:3500] + "..."
-        prompt = f"""Based on this transcript, create a quiz.
+    def _merge_summary_prompt(self, partials: List[str]) -> str:
+        sections = "\n\n".join(f"Part {i}:\n{partial}" for i, partial in enumerate(partials, start=1))
+        return f"""These are summaries of consecutive parts of one YouTube video, in order.
+Combine them into a single comprehensive summary of the whole video.
+
+{self.SUMMARY_FORMAT}
+
+Part summaries:
+{sections}
+"""
+
+    async def _build_summary_prompt(self, transcript: str) -> str:
+        """Summary prompt for the whole video. Long transcripts are summarized
+        segment by segment first, and the prompt merges those summaries."""
+        if not self._summarizer.needs_map(transcript):
+            return self._summary_prompt(transcript)
+        partials = await self._summarizer.summarize_segments(self.llm, transcript)
+        return self._merge_summary_prompt(partials)
+
+    def _quiz_prompt(self, transcript: str, user_message: str) -> str:
+        transcript = self._relevant_context(transcript, user_message)
+        return f"""Based on this transcript, create a quiz.
 User request: {user_message}
 
 **Quiz:**
@@ -167,27 +231,51 @@ D) ...
 Transcript:
 {transcript}
 """
-        try:
-            response = await self.llm.ainvoke(prompt)
-            return response.content
-        except Exception as e:
-            return f"Error generating quiz: {str(e)}"
 
-    async def _answer_question(self, transcript: str, question: str) -> str:
-        if len(transcript) > 3500:
-            transcript = transcript[:3500] + "..."
+    def _question_prompt(self, transcript: str, question: str) -> Optional[str]:
+        """Prompt for a question about the video, or None if the video can't answer it."""
         if not self._is_answerable_from_video(question, transcript):
-            return self._generate_fallback_message(question)
-        prompt = f"""Based on this transcript, answer:
+            return None
+        transcript = self._relevant_context(transcript, question)
+        return f"""Based on this transcript, answer:
 Question: {question}
 Transcript:
 {transcript}
 """
+
+    def _doubt_prompt(self, transcript: str, doubt: str) -> str:
+        transcript = self._relevant_context(transcript, doubt)
+        return f"""User's confusion: {doubt}
+Help them understand step-by-step using the video transcript below.
+
+Transcript:
+{transcript}
+"""
+
+    async def _generate_summary(self, transcript: str) -> str:
         try:
-            response = await self.llm.ainvoke(prompt)
-            return response.content
+            prompt = await self._build_summary_prompt(transcript)
         except Exception as e:
-            return f"Error answering question: {str(e)}"
+            return f"Error generating summary: {str(e)}"
+        return await self._complete(prompt, "Error generating summary")
+
+    async def _stream_summary(self, transcript: str) -> AsyncIterator[str]:
+        try:
+            prompt = await self._build_summary_prompt(transcript)
+        except Exception as e:
+            yield f"Error generating summary: {str(e)}"
+            return
+        async for chunk in self._stream(prompt, "Error generating summary"):
+            yield chunk
+
+    async def _generate_quiz(self, transcript: str, user_message: str) -> str:
+        return await self._complete(self._quiz_prompt(transcript, user_message), "Error generating quiz", cache=False)
+
+    async def _answer_question(self, transcript: str, question: str) -> str:
+        prompt = self._question_prompt(transcript, question)
+        if prompt is None:
+            return self._generate_fallback_message(question)
+        return await self._complete(prompt, "Error answering question", cache=False)
 
     def _generate_fallback_message(self, question: str) -> str:
         return f"""I understand you're asking about "{question}", but it doesn’t seem to be discussed in the video.
@@ -199,43 +287,41 @@ I can help with:
 Try asking something like: "Can you explain [topic]?" or "What are the main points?" """
 
     async def _clarify_doubt(self, transcript: str, doubt: str) -> str:
-        if len(transcript) > 3500:
-            transcript = transcript[:3500] + "..."
-        prompt = f"""User's confusion: {doubt}
-Help them understand step-by-step using the video transcript below.
+        return await self._complete(self._doubt_prompt(transcript, doubt), "Error clarifying doubt", cache=False)
 
-Transcript:
-{transcript}
-"""
-        try:
-            response = await self.llm.ainvoke(prompt)
-            return response.content
-        except Exception as e:
-            return f"Error clarifying doubt: {str(e)}"
+    def _follow_up_prompt(self, intent: str, transcript: str, message: str) -> Tuple[Optional[str], str]:
+        """Prompt and error label for a question, doubt or quiz about the current video."""
+        if intent == "generate_quiz":
+            return self._quiz_prompt(transcript, message), "Error generating quiz"
+        elif intent == "clarify_doubt":
+            return self._doubt_prompt(transcript, message), "Error clarifying doubt"
+        return self._question_prompt(transcript, message), "Error answering question"
+
+    def shares_results(self, input_data: Dict[str, Any]) -> bool:
+        """Answers depend on the session's active video, so identical messages from
+        different sessions must not share a result. (Transcript fetches and LLM
+        calls are still deduplicated underneath.)"""
+        return False
 
     async def run_tool(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             message = input_data.get("message", "")
+            session_id = input_data.get("session_id") or DEFAULT_SESSION
             print(f"Processing message: {message}")
-            has_video = len(self._video_cache) > 0
-            intent = self._detect_intent(message, has_video)
+            video = self._videos.get(session_id)
+            intent = self._detect_intent(message, video is not None)
             print(f"Detected intent: {intent}")
             if intent == "new_video":
-                return await self._process_new_video(message.strip())
+                return await self._process_new_video(message.strip(), session_id)
             elif intent == "need_video":
                 return {
                     "type": "need_video",
                     "content": "Paste a YouTube URL to start.",
                     "source": "YouTubeAgent"
                 }
-            elif not self._video_cache:
-                return {
-                    "type": "need_video",
-                    "content": "Please provide a YouTube URL first.",
-                    "source": "YouTubeAgent"
-                }
-            latest_video = list(self._video_cache.values())[-1]
-            transcript = latest_video["transcript"]
+            transcript = await self._fetch_transcript(video["video_id"])
+            if not transcript:
+                return {"type": "error", "content": "Sorry, I couldn't access the transcript for this video.", "source": "YouTubeAgent"}
             if intent == "generate_quiz":
                 content = await self._generate_quiz(transcript, message)
             elif intent == "clarify_doubt":
@@ -256,5 +342,54 @@ Transcript:
                 "source": "YouTubeAgent"
             }
 
+    async def stream_tool(self, input_data: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Streaming variant of run_tool.
+        Yields text chunks as the LLM produces them, then one final result dict
+        with type and source (and content, when nothing was streamed).
+        """
+        try:
+            message = input_data.get("message", "")
+            session_id = input_data.get("session_id") or DEFAULT_SESSION
+            print(f"Streaming message: {message}")
+            video = self._videos.get(session_id)
+            intent = self._detect_intent(message, video is not None)
+            print(f"Detected intent: {intent}")
+            if intent == "new_video":
+                video = await self._load_video(message.strip(), session_id)
+                if "transcript" not in video:
+                    yield video
+                    return
+                yield "Video Analysis Complete!\n\n"
+                async for chunk in self._stream_summary(video["transcript"]):
+                    yield chunk
+                yield {"type": "video_summary", "source": "YouTubeAgent", "video_id": video["video_id"]}
+                return
+            if intent == "need_video":
+                yield await self.run_tool(input_data)
+                return
+            transcript = await self._fetch_transcript(video["video_id"])
+            if not transcript:
+                yield {"type": "error", "content": "Sorry, I couldn't access the transcript for this video.", "source": "YouTubeAgent"}
+                return
+            if intent == "summarize":
+                async for chunk in self._stream_summary(transcript):
+                    yield chunk
+                yield {"type": intent, "source": "YouTubeAgent"}
+                return
+            prompt, error_label = self._follow_up_prompt(intent, transcript, message)
+            if prompt is None:
+                yield self._generate_fallback_message(message)
+            else:
+                async for chunk in self._stream(prompt, error_label, cache=False):
+                    yield chunk
+            yield {"type": intent, "source": "YouTubeAgent"}
+        except Exception as e:
+            yield {
+                "type": "error",
+                "content": f"Error: {str(e)}",
+                "source": "YouTubeAgent"
+            }
+
     async def __call__(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         return await self.run_tool(input_data)
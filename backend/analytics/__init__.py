@@ -0,0 +1,3 @@
+"""
+Dataset analysis helpers used by DataAgent
+"""
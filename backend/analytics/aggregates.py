@@ -0,0 +1,182 @@
+"""
+Mergeable partial aggregates over numeric columns
+
+Each aggregate is computed for one chunk of rows and merged with the
+aggregate of the rows before it. The merged result is the same as computing
+over all rows at once, so memory depends on the number of columns, not rows.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+class Moments:
+    """
+    Per-column count, mean, sum of squared deviations (M2), min and max.
+    Missing values (NaN) are skipped. Merging uses the pairwise update of
+    Chan, Golub and LeVeque, which stays accurate for large counts.
+    """
+
+    def __init__(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray,
+                 minimum: np.ndarray, maximum: np.ndarray):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "Moments":
+        """Moments of a (rows x columns) float array."""
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, values, 0.0).sum(axis=0) / count
+            m2 = np.where(valid, (values - mean) ** 2, 0.0).sum(axis=0)
+        empty = count == 0
+        mean[empty] = 0.0
+        m2[empty] = 0.0
+        minimum = np.fmin.reduce(values, axis=0, initial=np.inf)
+        maximum = np.fmax.reduce(values, axis=0, initial=-np.inf)
+        return cls(count, mean, m2, minimum, maximum)
+
+    def merge(self, other: "Moments") -> "Moments":
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(count > 0, other.count / count, 0.0)
+        mean = self.mean + delta * share
+        m2 = self.m2 + other.m2 + delta ** 2 * self.count * share
+        return Moments(count, mean, m2, np.fmin(self.minimum, other.minimum), np.fmax(self.maximum, other.maximum))
+
+    def take(self, keep: List[int]) -> "Moments":
+        """Only the given columns, in that order."""
+        return Moments(self.count[keep], self.mean[keep], self.m2[keep], self.minimum[keep], self.maximum[keep])
+
+    def finalize(self) -> dict:
+        """pandas-style count, mean, std (n - 1), min and max; NaN where undefined."""
+        empty = self.count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        std[self.count < 2] = np.nan
+        return {
+            "count": self.count,
+            "mean": np.where(empty, np.nan, self.mean),
+            "std": std,
+            "min": np.where(empty, np.nan, self.minimum),
+            "max": np.where(empty, np.nan, self.maximum),
+        }
+
+
+class CoMoments:
+    """
+    Sums for pairwise-complete Pearson correlation, like DataFrame.corr().
+
+    For each pair of columns (i, j) only rows where both are present count.
+    With M the presence mask and X the values (0 where missing), the sums
+    are N = M'M, A = X'M, B = (X*X)'M and C = X'X, and all four simply add
+    up across chunks. Values are shifted by a per-column constant taken from
+    the first chunk. Correlation doesn't change under a shift, and it keeps
+    the sums small enough to avoid cancellation.
+    """
+
+    def __init__(self, shift: np.ndarray):
+        p = len(shift)
+        self.shift = shift
+        self.n = np.zeros((p, p))
+        self.a = np.zeros((p, p))
+        self.b = np.zeros((p, p))
+        self.c = np.zeros((p, p))
+
+    @classmethod
+    def for_values(cls, values: np.ndarray) -> "CoMoments":
+        """Empty sums, shifted by the column means of this first chunk."""
+        present = ~np.isnan(values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shift = np.where(present, values, 0.0).sum(axis=0) / present.sum(axis=0)
+        return cls(np.nan_to_num(shift))
+
+    def add(self, values: np.ndarray) -> None:
+        present = ~np.isnan(values)
+        mask = present.astype(np.float64)
+        x = np.where(present, values - self.shift, 0.0)
+        self.n += mask.T @ mask
+        self.a += x.T @ mask
+        self.b += (x * x).T @ mask
+        self.c += x.T @ x
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        """Sum of two partials that used the same shift."""
+        merged = CoMoments(self.shift)
+        merged.n, merged.a, merged.b, merged.c = self.n + other.n, self.a + other.a, self.b + other.b, self.c + other.c
+        return merged
+
+    def take(self, keep: List[int]) -> "CoMoments":
+        kept = CoMoments(self.shift[keep])
+        grid = np.ix_(keep, keep)
+        kept.n, kept.a, kept.b, kept.c = self.n[grid], self.a[grid], self.b[grid], self.c[grid]
+        return kept
+
+    def correlation(self) -> np.ndarray:
+        n, a, b, c = self.n, self.a, self.b, self.c
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = n * c - a * a.T
+            variance_i = n * b - a * a
+            variance_j = variance_i.T
+            corr = covariance / np.sqrt(variance_i * variance_j)
+        corr[(n < 1) | (variance_i <= 0) | (variance_j <= 0)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+class BottomKSample:
+    """
+    A uniform sample of up to k values per column, kept as the k values
+    with the smallest random priorities. Two samples merge by keeping the k
+    smallest priorities of both, which is again a uniform sample of the
+    combined rows. When a column has at most k values, the sample is all of
+    them, so quantiles from it are exact.
+    """
+
+    def __init__(self, k: int, values: List[np.ndarray], priorities: List[np.ndarray]):
+        self.k = k
+        self.values = values
+        self.priorities = priorities
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, k: int, rng: np.random.Generator) -> "BottomKSample":
+        sampled, priorities = [], []
+        for column in values.T:
+            present = column[~np.isnan(column)]
+            keys = rng.random(len(present))
+            if len(present) > k:
+                keep = np.argpartition(keys, k - 1)[:k]
+                present, keys = present[keep], keys[keep]
+            sampled.append(present)
+            priorities.append(keys)
+        return cls(k, sampled, priorities)
+
+    def merge(self, other: "BottomKSample") -> "BottomKSample":
+        sampled, priorities = [], []
+        for va, pa, vb, pb in zip(self.values, self.priorities, other.values, other.priorities):
+            values, keys = np.concatenate([va, vb]), np.concatenate([pa, pb])
+            if len(values) > self.k:
+                keep = np.argpartition(keys, self.k - 1)[:self.k]
+                values, keys = values[keep], keys[keep]
+            sampled.append(values)
+            priorities.append(keys)
+        return BottomKSample(self.k, sampled, priorities)
+
+    def take(self, keep: List[int]) -> "BottomKSample":
+        return BottomKSample(self.k, [self.values[i] for i in keep], [self.priorities[i] for i in keep])
+
+    def quantiles(self, qs: List[float]) -> np.ndarray:
+        """(len(qs) x columns) quantiles, NaN for columns with no values."""
+        return np.array([
+            np.quantile(values, qs) if len(values) else np.full(len(qs), np.nan)
+            for values in self.values
+        ]).T.reshape(len(qs), len(self.values))
+
+    def nbytes(self) -> int:
+        return sum(values.nbytes + keys.nbytes for values, keys in zip(self.values, self.priorities))
+
@@ -0,0 +1,114 @@
+"""
+Parsed datasets cached by content hash, so follow-up questions skip parsing
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+def content_id(text: str) -> str:
+    """Dataset handle for CSV text: a hash of its content. Hashed in slices to avoid encoding a copy of it all."""
+    digest = hashlib.sha256()
+    step = 1 << 20
+    for start in range(0, len(text), step):
+        digest.update(text[start:start + step].encode("utf-8"))
+    return "ds_" + digest.hexdigest()[:24]
+
+
+class DatasetCache:
+    """
+    Profiles (see analytics.profile) keyed by dataset id, in LRU order and
+    bounded by their total memory footprint rather than their number. A
+    dataset bigger than the whole budget is served but not kept. Profiles
+    grow as they memoize answers, so callers remeasure them after use.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, dataset_id: str) -> Optional[Any]:
+        with self._lock:
+            profile = self._entries.get(dataset_id)
+            if profile is not None:
+                self._entries.move_to_end(dataset_id)
+                self.hits += 1
+            return profile
+
+    def put(self, dataset_id: str, profile: Any) -> None:
+        size = profile.memory_bytes()
+        with self._lock:
+            self._store(dataset_id, profile, size)
+
+    def remeasure(self, dataset_id: str) -> None:
+        """
+        Update a cached profile's size after it has memoized more results
+        (see FrameProfile), evicting older datasets if that puts the cache
+        over budget.
+        """
+        with self._lock:
+            profile = self._entries.get(dataset_id)
+        if profile is None:
+            return
+        size = profile.memory_bytes()
+        with self._lock:
+            if self._entries.get(dataset_id) is profile:
+                self._store(dataset_id, profile, size)
+
+    def _store(self, dataset_id: str, profile: Any, size: int) -> None:
+        if dataset_id in self._entries:
+            self._bytes -= self._sizes.pop(dataset_id)
+            del self._entries[dataset_id]
+        if size > self.max_bytes:
+            return
+        self._entries[dataset_id] = profile
+        self._sizes[dataset_id] = size
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            evicted, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(evicted)
+            self.evictions += 1
+
+    def get_or_load(self, dataset_id: str, load: Callable[[], Any]) -> Any:
+        profile = self.get(dataset_id)
+        if profile is None:
+            with self._lock:
+                self.misses += 1
+            profile = load()
+            self.put(dataset_id, profile)
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "datasets": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_cache: Optional[DatasetCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache() -> DatasetCache:
+    """Return this process's dataset cache, sized by AGENTBAY_DATASET_CACHE_MB."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DatasetCache(int(os.getenv("AGENTBAY_DATASET_CACHE_MB", "512")) * 1024 * 1024)
+    return _cache
+
@@ -0,0 +1,78 @@
+"""
+Compact dtypes for datasets held in memory
+"""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+REPORT_COLUMNS = ["dtype before", "bytes before", "dtype after", "bytes after"]
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:,.0f} {unit}" if unit == "bytes" else f"{size:,.1f} {unit}"
+        size /= 1024
+
+
+def _is_text(dtype) -> bool:
+    return not isinstance(dtype, pd.CategoricalDtype) and (
+        pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype))
+
+
+def _downcast_float(column: pd.Series) -> pd.Series:
+    """float32 when every value survives the round trip exactly, so no statistic changes."""
+    values = column.to_numpy()
+    narrow = values.astype(np.float32)
+    with np.errstate(invalid="ignore"):
+        exact = np.array_equal(narrow.astype(np.float64), values, equal_nan=True)
+    return pd.Series(narrow, index=column.index, name=column.name) if exact else column
+
+
+def _compact_text(column: pd.Series, category_ratio: float, arrow_strings: bool) -> pd.Series:
+    codes, uniques = pd.factorize(column)
+    if len(uniques) <= category_ratio * len(column):
+        return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=column.index, name=column.name)
+    if arrow_strings and pd.api.types.infer_dtype(column, skipna=True) == "string":
+        return column.astype("string[pyarrow]")
+    return column
+
+
+def optimize_dtypes(df: pd.DataFrame, category_ratio: float = 0.5,
+                    arrow_strings: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Shrink a DataFrame's columns without changing their values:
+
+    - integers are downcast to the smallest integer type that holds them
+    - floats become float32 when that is exact for every value
+    - text columns with at most `category_ratio` distinct values per row
+      become categoricals; others become Arrow-backed strings when
+      `arrow_strings` is set (requires pyarrow)
+
+    Returns the new frame and a report of dtype and bytes per column,
+    before and after.
+    """
+    before = df.memory_usage(index=False, deep=True)
+    dtypes_before = df.dtypes.astype(str)
+    optimized = df.copy(deep=False)
+    for position, (_, column) in enumerate(df.items()):
+        dtype = column.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+            column = pd.to_numeric(column, downcast="integer")
+        elif pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype) and dtype.itemsize > 4:
+            column = _downcast_float(column)
+        elif _is_text(dtype):
+            column = _compact_text(column, category_ratio, arrow_strings)
+        optimized.isetitem(position, column)
+
+    report = pd.DataFrame({
+        "dtype before": dtypes_before.to_numpy(),
+        "bytes before": before.to_numpy(),
+        "dtype after": optimized.dtypes.astype(str).to_numpy(),
+        "bytes after": optimized.memory_usage(index=False, deep=True).to_numpy(),
+    }, index=df.columns, columns=REPORT_COLUMNS)
+    return optimized, report
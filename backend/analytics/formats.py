@@ -0,0 +1,88 @@
+"""
+Readers for dataset files: CSV, Parquet and JSON Lines
+
+pyarrow is optional. With it, CSV files are parsed by its multithreaded
+engine and Parquet/JSONL files are read through a memory map. Without it,
+CSV and JSONL fall back to pandas' own parsers and Parquet is unavailable.
+"""
+
+from pathlib import Path
+from typing import Iterator, Optional
+
+FORMATS = ("csv", "parquet", "jsonl")
+EXTENSIONS = {".csv": "csv", ".txt": "csv", ".parquet": "parquet", ".pq": "parquet",
+              ".jsonl": "jsonl", ".ndjson": "jsonl"}
+CONTENT_TYPES = {"text/csv": "csv", "application/vnd.apache.parquet": "parquet",
+                 "application/x-parquet": "parquet", "application/jsonl": "jsonl",
+                 "application/x-ndjson": "jsonl", "application/x-jsonlines": "jsonl"}
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Dataset format from the file extension, else the content type; None if unsupported."""
+    if filename:
+        fmt = EXTENSIONS.get(Path(filename).suffix.lower())
+        if fmt:
+            return fmt
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def file_format(path: str) -> str:
+    """Format of a spooled dataset file, from its extension."""
+    return EXTENSIONS.get(Path(path).suffix.lower(), "csv")
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _require_pyarrow(fmt: str) -> None:
+    if not has_pyarrow():
+        raise ValueError(f"Reading {fmt} files requires pyarrow, which is not installed.")
+
+
+def read_frame(path: str, fmt: Optional[str] = None):
+    """Read a whole dataset file into a DataFrame."""
+    import pandas as pd
+    from analytics.profile import CSV_OPTIONS
+
+    fmt = fmt or file_format(path)
+    if fmt == "parquet":
+        _require_pyarrow("Parquet")
+        return pd.read_parquet(path, engine="pyarrow", memory_map=True)
+    if fmt == "jsonl":
+        if has_pyarrow():
+            import pyarrow as pa
+            import pyarrow.json as pa_json
+            with pa.memory_map(path) as source:
+                return pa_json.read_json(source).to_pandas()
+        return pd.read_json(path, lines=True)
+    if has_pyarrow():
+        return pd.read_csv(path, engine="pyarrow", **CSV_OPTIONS)
+    return pd.read_csv(path, memory_map=True, **CSV_OPTIONS)
+
+
+def read_chunks(path: str, chunk_rows: int, fmt: Optional[str] = None) -> Iterator:
+    """Read a dataset file `chunk_rows` rows at a time (as DataFrames), for streaming profiles."""
+    import pandas as pd
+    from analytics.profile import CSV_OPTIONS
+
+    fmt = fmt or file_format(path)
+    if fmt == "parquet":
+        _require_pyarrow("Parquet")
+        import pyarrow.parquet as pq
+        with pq.ParquetFile(path, memory_map=True) as parquet:
+            for batch in parquet.iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+    elif fmt == "jsonl":
+        with pd.read_json(path, lines=True, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        # pyarrow's CSV engine can't read in chunks; pandas' C engine can
+        with pd.read_csv(path, chunksize=chunk_rows, memory_map=True, **CSV_OPTIONS) as reader:
+            yield from reader
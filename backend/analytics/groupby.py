@@ -0,0 +1,289 @@
+"""
+Group-by aggregation for DataAgent: query parsing and grouped kernels
+
+parse_group_by() turns a question such as "average price and max quantity
+by region" into a GroupBySpec. group_frame() runs it on a DataFrame in
+memory; group_chunks() runs it over a dataset read in chunks, merging
+per-chunk partial aggregates.
+"""
+
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+AGGREGATION_WORDS = {
+    "mean": "mean", "means": "mean", "average": "mean", "averages": "mean", "avg": "mean",
+    "sum": "sum", "sums": "sum", "total": "sum", "totals": "sum",
+    "count": "count", "counts": "count", "number of": "count", "how many": "count",
+    "min": "min", "minimum": "min", "lowest": "min", "smallest": "min",
+    "max": "max", "maximum": "max", "highest": "max", "largest": "max",
+    "nunique": "nunique", "unique": "nunique", "distinct": "nunique",
+}
+KEY_PHRASES = ("group by", "grouped by", "grouping by", "for each", "for every", "by", "per")
+NOT_GROUPING = re.compile(r"\b(?:sort|sorted|order|ordered|rank|ranked)\s+by\b")
+UNIQUE_COUNT = re.compile(r"\b(?:number of|how many|count of)\s+(unique|distinct)\b")
+RANKING = re.compile(r"\b(top|highest|bottom|lowest)\s+(\d+)\b")
+ID_SUFFIXES = ("id", "name", "code", "key")
+SIZE_COLUMN = "rows"
+
+
+class GroupBySpec:
+    """
+    Group keys plus (column, aggregation) pairs. `size` adds the number of
+    rows per group. Results are sorted by `sort_by` (descending unless
+    `ascending`) and cut to the first `limit` groups.
+    """
+
+    def __init__(self, keys: List[str], aggregations: List[Tuple[str, str]], size: bool = False,
+                 ascending: bool = False, limit: int = 20):
+        self.keys = keys
+        self.aggregations = aggregations
+        self.size = size
+        self.ascending = ascending
+        self.limit = limit
+
+    @property
+    def columns(self) -> List[str]:
+        """Result columns, in order."""
+        return ([SIZE_COLUMN] if self.size else []) + [f"{column}_{func}" for column, func in self.aggregations]
+
+    @property
+    def sort_by(self) -> str:
+        return self.columns[0]
+
+    def key(self) -> tuple:
+        """Hashable identity, for memoizing results."""
+        return tuple(self.keys), tuple(self.aggregations), self.size, self.ascending, self.limit
+
+
+def _mentions(text: str, names: Sequence[str]) -> List[Tuple[int, int, str]]:
+    """
+    (start, end, name) of every column name in text, longest names first,
+    without overlaps. "_" and spaces are interchangeable and a plural "s"
+    is allowed, so "unit price" and "regions" match unit_price and region.
+    Identifier columns also match without their suffix ("customers" for
+    customer_id).
+    """
+    found, taken = [], []
+    for name in sorted(names, key=len, reverse=True):
+        words = re.split(r"[\s_]+", name.lower().strip())
+        if len(words) > 1 and words[-1] in ID_SUFFIXES:
+            words[-1] = f"(?:{words[-1]})"
+            body = r"[\s_]+".join(re.escape(word) for word in words[:-1]) + r"(?:[\s_]+" + words[-1] + ")?"
+        else:
+            body = r"[\s_]+".join(re.escape(word) for word in words)
+        pattern = r"(?<!\w)" + body + r"s?(?!\w)"
+        for match in re.finditer(pattern, text):
+            start, end = match.span()
+            if not any(start < other_end and other_start < end for other_start, other_end in taken):
+                taken.append((start, end))
+                found.append((start, end, name))
+    return found
+
+
+def _phrases(text: str, phrases: Iterable[str]) -> List[Tuple[int, int, str]]:
+    found = []
+    for phrase in phrases:
+        for match in re.finditer(r"(?<!\w)" + re.escape(phrase) + r"(?!\w)", text):
+            found.append((match.start(), match.end(), phrase))
+    return found
+
+
+def parse_group_by(query: str, columns: Sequence[str], numeric_columns: Sequence[str],
+                   limit: int = 20) -> Optional[GroupBySpec]:
+    """
+    Read group keys and aggregations out of a question, or return None if
+    it isn't a group-by question (no "by"/"per"/"for each" next to a
+    column name).
+
+    Columns after a key phrase are keys, up to the next aggregation word.
+    When only numeric columns follow it, the columns before it are the keys
+    instead and the groups are ranked by the sum of the numeric ones ("top
+    10 products by revenue"). "top N" / "bottom N" set the order and number
+    of groups.
+    An aggregation word applies to the columns named after it ("mean of
+    price and max of quantity by region"); one with no column of its own
+    applies to every numeric non-key column ("group by region and show
+    averages"). With no aggregation word at all, groups get their row
+    count and the mean of each numeric column.
+    """
+    text = UNIQUE_COUNT.sub(r"\1", NOT_GROUPING.sub(" ", query.lower()))
+    ranking = RANKING.search(text)
+    if ranking:
+        limit = min(limit, max(1, int(ranking.group(2))))
+        text = text[:ranking.start()] + " " + text[ranking.end():]
+    column_spans = _mentions(text, [str(column) for column in columns])
+    events = sorted(
+        [(start, end, "column", name) for start, end, name in column_spans]
+        + [(start, end, "agg", AGGREGATION_WORDS[word]) for start, end, word in _phrases(text, AGGREGATION_WORDS)]
+        + [(start, end, "key", phrase) for start, end, phrase in _phrases(text, KEY_PHRASES)],
+        # Longest match first; a column named like an aggregation word ("total") counts as the column
+        key=lambda event: (event[0], -event[1], event[2] != "column"),
+    )
+
+    keys: List[str] = []
+    pending: List[str] = []    # Aggregations waiting for their columns
+    targeted: List[Tuple[str, str]] = []
+    bare_columns: List[str] = []
+    leading_columns: List[str] = []  # Bare columns before the first key phrase
+    funcs: List[str] = []
+    in_keys, seen_key, last_end, previous = False, False, -1, None
+    for start, end, kind, value in events:
+        if start < last_end:
+            continue  # Inside a longer match, e.g. "by" in "group by"
+        last_end = end
+        if kind == "key":
+            in_keys = True
+            if not seen_key:
+                leading_columns = list(bare_columns)
+            seen_key = True
+        elif kind == "agg":
+            in_keys = False
+            pending = pending + [value] if previous == "agg" else [value]
+            if value not in funcs:
+                funcs.append(value)
+        elif in_keys:
+            if value not in keys:
+                keys.append(value)
+        elif pending:
+            targeted.extend((value, func) for func in pending)
+        else:
+            bare_columns.append(value)
+        previous = kind
+    # "products by revenue": ranking groups by a measure, not grouping by it
+    ranked = bool(leading_columns) and all(key in numeric_columns for key in keys) \
+        and (ranking is not None or any(column not in numeric_columns for column in leading_columns))
+    if ranked:
+        bare_columns = [column for column in bare_columns if column not in leading_columns] + keys
+        keys = leading_columns
+    if not keys:
+        return None
+
+    name_of = {str(column): column for column in columns}
+    keys = [name_of[key] for key in keys]
+    # Identifier columns (customer_id, ...) are only aggregated when named
+    numeric = [column for column in numeric_columns
+               if column not in keys and re.split(r"[\s_]+", str(column).lower())[-1] not in ID_SUFFIXES]
+    targeted = [(name_of[column], func) for column, func in targeted if name_of[column] not in keys]
+    bare_columns = [name_of[column] for column in bare_columns if name_of[column] not in keys]
+
+    aggregations: List[Tuple[str, str]] = []
+    size = not funcs and not ranked
+    for func in funcs or (["sum"] if ranked else ["mean"]):
+        named = [column for column, target in targeted if target == func] + bare_columns
+        if named:
+            aggregations.extend((column, func) for column in named)
+        elif func == "count":
+            size = True
+        else:
+            candidates = numeric if func != "nunique" else [c for c in columns if c not in keys]
+            aggregations.extend((column, func) for column in candidates)
+    aggregations = list(dict.fromkeys(
+        (column, func) for column, func in aggregations
+        if func in ("count", "nunique") or column in numeric_columns
+    ))
+    if not aggregations:
+        size = True
+
+    ascending = bool(re.search(r"\b(ascending|bottom|fewest|least)\b", text)) \
+        or bool(ranking and ranking.group(1) in ("bottom", "lowest"))
+    return GroupBySpec(keys, aggregations, size=size, ascending=ascending, limit=limit)
+
+
+def _categorical(column: pd.Series) -> pd.Series:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column
+    # factorize hashes once and keeps first-seen order; astype("category") would also sort the categories
+    codes, uniques = pd.factorize(column)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=column.index, name=column.name)
+
+
+def as_categories(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """The key columns as categoricals, so grouping works on integer codes."""
+    return pd.DataFrame({key: _categorical(frame[key]) for key in keys})
+
+
+def _top(result: pd.DataFrame, spec: GroupBySpec) -> Tuple[pd.DataFrame, int]:
+    """Groups sorted on spec.sort_by and cut to spec.limit, plus the total number of groups."""
+    pick = result.nsmallest if spec.ascending else result.nlargest
+    if pd.api.types.is_numeric_dtype(result[spec.sort_by]) and len(result) > spec.limit:
+        top = pick(spec.limit, spec.sort_by, keep="first")
+    else:
+        top = result.sort_values(spec.sort_by, ascending=spec.ascending, kind="stable").head(spec.limit)
+    return top, len(result)
+
+
+def group_frame(frame: pd.DataFrame, spec: GroupBySpec,
+                keys: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Run a GroupBySpec on a DataFrame with pandas' grouped kernels. `keys`
+    may hold the key columns already converted by as_categories().
+    """
+    keys = as_categories(frame, spec.keys) if keys is None else keys
+    grouped = frame.groupby([keys[key] for key in spec.keys], observed=True, sort=False)
+    parts = []
+    if spec.size:
+        parts.append(grouped.size().rename(SIZE_COLUMN))
+    if spec.aggregations:
+        parts.append(grouped.agg(**{f"{column}_{func}": (column, func) for column, func in spec.aggregations}))
+    return _top(pd.concat(parts, axis=1), spec)
+
+
+# Partial aggregates per chunk, and how partials of the same group combine
+_PARTIALS = {"sum": ["sum"], "mean": ["sum", "count"], "count": ["count"], "min": ["min"], "max": ["max"]}
+_COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max", "size": "sum"}
+
+
+def group_chunks(chunks: Iterable[pd.DataFrame], spec: GroupBySpec) -> Tuple[pd.DataFrame, int]:
+    """
+    Run a GroupBySpec over chunks of rows. Sums, counts, minima and maxima
+    are merged across chunks (means are sum / count at the end), and
+    nunique keeps each group's distinct values, so memory grows with the
+    number of groups rather than rows. Chunks are grouped on their raw key
+    values, since per-chunk categories wouldn't line up across chunks.
+    """
+    partial_specs = {}
+    if spec.size:
+        partial_specs["__size"] = (spec.keys[0], "size")
+    for column, func in spec.aggregations:
+        for part in _PARTIALS.get(func, []):
+            partial_specs[f"{column}__{part}"] = (column, part)
+    combine = {name: _COMBINE[part] for name, (_, part) in partial_specs.items()}
+    distinct_columns = [column for column, func in spec.aggregations if func == "nunique"]
+
+    merged: Optional[pd.DataFrame] = None
+    # Distinct (keys, value) rows per nunique column: deduplicated pieces plus
+    # the size after the last merge, which is redone only once pieces double it
+    distinct = {column: ([], 0) for column in distinct_columns}
+    for chunk in chunks:
+        if partial_specs:
+            partial = chunk.groupby(spec.keys, sort=False).agg(**partial_specs)
+            if merged is not None:
+                partial = pd.concat([merged, partial]).groupby(level=list(range(len(spec.keys))), sort=False).agg(combine)
+            merged = partial
+        for column in distinct_columns:
+            pieces, merged_rows = distinct[column]
+            pieces.append(chunk[spec.keys + [column]].dropna().drop_duplicates())
+            if sum(len(piece) for piece in pieces) > 2 * max(merged_rows, len(chunk)):
+                pieces[:] = [pd.concat(pieces).drop_duplicates()]
+                merged_rows = len(pieces[0])
+            distinct[column] = (pieces, merged_rows)
+
+    parts = []
+    if spec.size:
+        parts.append(merged["__size"].rename(SIZE_COLUMN))
+    for column, func in spec.aggregations:
+        name = f"{column}_{func}"
+        if func == "nunique":
+            pairs = pd.concat(distinct[column][0]).drop_duplicates()
+            parts.append(pairs.groupby(spec.keys, sort=False).size().rename(name))
+        elif func == "mean":
+            parts.append((merged[f"{column}__sum"] / merged[f"{column}__count"]).rename(name))
+        else:
+            parts.append(merged[f"{column}__{_PARTIALS[func][0]}"].rename(name))
+    result = pd.concat(parts, axis=1)
+    # Groups that only appear with missing values have no distinct values
+    nunique = [f"{column}_nunique" for column in distinct_columns]
+    result[nunique] = result[nunique].fillna(0).astype("int64")
+    return _top(result, spec)
@@ -0,0 +1,284 @@
+"""
+Dataset profiles: the statistics DataAgent reports, from memory or streamed
+"""
+
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.aggregates import BottomKSample, CoMoments, Moments
+from analytics.groupby import GroupBySpec, as_categories, group_chunks, group_frame
+from analytics.sketches import HyperLogLog, KLLColumns, RowReservoir, hash_values
+
+CSV_OPTIONS = {"encoding": "utf-8", "na_values": ["NA", "N/A", "missing"]}
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def result_bytes(value: Any) -> int:
+    """Bytes held by a memoized result: a pandas object, or a tuple of them and scalars."""
+    if isinstance(value, tuple):
+        return sum(result_bytes(item) for item in value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return sys.getsizeof(value)
+
+
+def is_numeric(dtype: Any) -> bool:
+    """Numeric the way select_dtypes(include="number") means it (booleans excluded)."""
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+class FrameProfile:
+    """
+    Profile of a DataFrame held in memory. StreamingProfile has the same
+    interface, so DataAgent formats both the same way.
+
+    Whole-frame results (null counts, describe, corr) are computed once per
+    profile, so a cached dataset answers repeat questions without rescanning.
+    They count towards memory_bytes along with the frame.
+    """
+
+    note: Optional[str] = None
+    streaming = False
+    approximate = False
+
+    def __init__(self, df: pd.DataFrame, memory_report: Optional[pd.DataFrame] = None):
+        self.df = df
+        self.memory_report = memory_report  # From analytics.dtypes.optimize_dtypes, if it was applied
+        self.rows = len(df)
+        self.columns = list(df.columns)
+        self._memo: Dict[str, Any] = {}
+        self._frame_bytes: Optional[int] = None
+
+    def _memoized(self, name: str, compute: Callable[[], Any]) -> Any:
+        if name not in self._memo:
+            self._memo[name] = compute()
+        return self._memo[name]
+
+    def memory_bytes(self) -> int:
+        if self._frame_bytes is None:
+            self._frame_bytes = int(self.df.memory_usage(deep=True).sum())
+        return self._frame_bytes + sum(result_bytes(value) for value in list(self._memo.values()))
+
+    def column_memory(self) -> Optional[pd.Series]:
+        """Bytes held per column."""
+        return self.df.memory_usage(index=False, deep=True)
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self.df.head(n)
+
+    def dtypes(self) -> Dict[str, str]:
+        return {column: str(dtype) for column, dtype in self.df.dtypes.items()}
+
+    def null_counts(self) -> pd.Series:
+        return self._memoized("null_counts", lambda: self.df.isnull().sum()).copy()
+
+    def numeric_columns(self) -> List[str]:
+        return list(self.df.select_dtypes(include=["number"]).columns)
+
+    def describe(self) -> pd.DataFrame:
+        return self._memoized("describe", lambda: self.df[self.numeric_columns()].describe())
+
+    def corr(self) -> pd.DataFrame:
+        return self._memoized("corr", lambda: self.df[self.numeric_columns()].corr())
+
+    def distinct_counts(self) -> Tuple[pd.Series, Optional[float]]:
+        """Distinct non-null values per column, and their relative error (None: exact)."""
+        return self._memoized("nunique", self.df.nunique), None
+
+    def group_by(self, spec: GroupBySpec) -> Tuple[pd.DataFrame, int]:
+        """Top groups and the number of groups (see analytics.groupby); key columns are converted to categoricals once."""
+        keys = pd.DataFrame({
+            key: self._memoized(f"category:{key}", lambda key=key: as_categories(self.df, [key])[key])
+            for key in spec.keys
+        })
+        return self._memoized(f"group_by:{spec.key()}", lambda: group_frame(self.df, spec, keys))
+
+
+class StreamingProfile:
+    """
+    Profile computed chunk by chunk with mergeable aggregates, so only one
+    chunk of rows is in memory at a time. Counts, means, std, min, max,
+    missing values and correlations are exact. Quartiles come from a
+    uniform sample of `sample_size` values per column, which is exact for
+    columns with no more values than that.
+
+    Group-by questions need the rows again: `rescan`, if given, returns a
+    fresh iterator over the same chunks.
+
+    With `approximate`, quartiles come from KLL sketches of `sketch_k`
+    items per level instead of the sample, and the profile also keeps a
+    HyperLogLog distinct counter per column and a uniform reservoir of
+    `sample_rows` rows (see analytics.sketches). Memory then stays bounded
+    however large the file is, and answers carry their error bounds.
+    """
+
+    def __init__(self, sample_size: int = 10000, head_rows: int = 100, seed: int = 0,
+                 rescan: Optional[Callable[[], Iterable[pd.DataFrame]]] = None,
+                 approximate: bool = False, sketch_k: int = 200, hll_precision: int = 14,
+                 sample_rows: int = 1000):
+        self.sample_size = sample_size
+        self.rescan = rescan
+        self.approximate = approximate
+        self._quantiles, self._quantile_size = (KLLColumns, sketch_k) if approximate else (BottomKSample, sample_size)
+        self._hll_precision = hll_precision
+        self._distinct: Dict[str, HyperLogLog] = {}
+        self._reservoir = RowReservoir(sample_rows, np.random.default_rng(seed + 1)) if approximate else None
+        self._groups: Dict[tuple, Tuple[pd.DataFrame, int]] = {}
+        self.head_rows = head_rows
+        self._rng = np.random.default_rng(seed)
+        self.rows = 0
+        self.chunks = 0
+        self.columns: List[str] = []
+        self._head: Optional[pd.DataFrame] = None
+        self._dtypes: Dict[str, set] = {}
+        self._nulls: Optional[pd.Series] = None
+        self._numeric: List[str] = []
+        self._moments: Optional[Moments] = None
+        self._sample: Optional[Any] = None  # BottomKSample, or KLLColumns when approximate
+        self._comoments: Optional[CoMoments] = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Fold one chunk of rows into the profile."""
+        if self.chunks == 0:
+            self.columns = list(chunk.columns)
+            self._head = chunk.head(self.head_rows)
+            self._dtypes = {column: set() for column in self.columns}
+            self._nulls = pd.Series(0, index=self.columns, dtype="int64")
+            self._numeric = [column for column in self.columns if is_numeric(chunk[column].dtype)]
+        self.chunks += 1
+        self.rows += len(chunk)
+
+        nulls = chunk.isnull().sum()
+        self._nulls += nulls
+        for column in self.columns:
+            # A chunk where the column is entirely empty says nothing about its type
+            if nulls[column] < len(chunk):
+                self._dtypes[column].add(chunk[column].dtype)
+
+        # A column stops being numeric as soon as one chunk has text in it
+        still_numeric = [column for column in self._numeric if is_numeric(chunk[column].dtype)]
+        if len(still_numeric) < len(self._numeric):
+            keep = [self._numeric.index(column) for column in still_numeric]
+            self._numeric = still_numeric
+            if self._moments is not None:
+                self._moments = self._moments.take(keep)
+                self._sample = self._sample.take(keep)
+                self._comoments = self._comoments.take(keep)
+
+        if self.approximate:
+            for column in self.columns:
+                distinct = self._distinct.setdefault(column, HyperLogLog(self._hll_precision))
+                distinct.add_hashes(hash_values(chunk[column]))
+            self._reservoir.add(chunk)
+
+        values = chunk[self._numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        moments = Moments.from_values(values)
+        sample = self._quantiles.from_values(values, self._quantile_size, self._rng)
+        if self._moments is None:
+            self._moments, self._sample = moments, sample
+            self._comoments = CoMoments.for_values(values)
+        else:
+            self._moments = self._moments.merge(moments)
+            self._sample = self._sample.merge(sample)
+        self._comoments.add(values)
+
+    @property
+    def note(self) -> Optional[str]:
+        note = f"Computed in streaming mode over {self.chunks} chunk{'s' if self.chunks != 1 else ''}."
+        if self.approximate:
+            error = self._sample.rank_error() if self._sample is not None else 0.0
+            if error:
+                note += (f" Approximate mode: quartiles are within ±{error:.1%} of their rank (99% confidence);"
+                         " counts, means, std, min, max and missing values are exact.")
+            else:
+                note += " Approximate mode: every statistic shown is still exact."
+        elif self._moments is not None and (self._moments.count > self.sample_size).any():
+            note += f" Quartiles are estimated from a sample of {self.sample_size:,} values per column."
+        return note
+
+    memory_report = None
+    streaming = True
+
+    def column_memory(self) -> Optional[pd.Series]:
+        """None: the rows themselves aren't held in memory."""
+        return None
+
+    def memory_bytes(self) -> int:
+        sketches = self._sample.nbytes() + sum(distinct.nbytes() for distinct in self._distinct.values())
+        if self._reservoir is not None:
+            sketches += self._reservoir.nbytes()
+        comoments = 4 * self._comoments.n.nbytes
+        groups = sum(result_bytes(result) for result in list(self._groups.values()))
+        return int(self._head.memory_usage(deep=True).sum()) + sketches + comoments + groups
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self._head.head(n)
+
+    def dtypes(self) -> Dict[str, str]:
+        merged = {}
+        for column, seen in self._dtypes.items():
+            if not seen:
+                merged[column] = "float64"  # Entirely empty, as pandas reads it
+            elif all(is_numeric(dtype) for dtype in seen):
+                merged[column] = str(np.result_type(*seen))
+            elif len({str(dtype) for dtype in seen}) == 1:
+                merged[column] = str(next(iter(seen)))
+            else:
+                merged[column] = "object"
+        return merged
+
+    def null_counts(self) -> pd.Series:
+        return self._nulls.copy()
+
+    def numeric_columns(self) -> List[str]:
+        return list(self._numeric)
+
+    def describe(self) -> pd.DataFrame:
+        stats = self._moments.finalize()
+        quartiles = self._sample.quantiles([0.25, 0.5, 0.75])
+        rows = [stats["count"], stats["mean"], stats["std"], stats["min"],
+                quartiles[0], quartiles[1], quartiles[2], stats["max"]]
+        index = list(DESCRIBE_INDEX)
+        if self.approximate and self._sample.rank_error():
+            index[4:7] = [f"{label} (±{self._sample.rank_error():.1%} rank)" for label in index[4:7]]
+        return pd.DataFrame(rows, index=index, columns=self._numeric)
+
+    def distinct_counts(self) -> Tuple[pd.Series, Optional[float]]:
+        """Estimated distinct non-null values per column, and their relative error (95% confidence)."""
+        if not self.approximate:
+            raise ValueError("Distinct counts of a streamed dataset are only available in approximate mode (send approximate=true).")
+        present = self.rows - self._nulls
+        estimates = pd.Series({column: round(self._distinct[column].estimate()) for column in self.columns}, dtype="int64")
+        error = self._distinct[self.columns[0]].relative_error() if self.columns else 0.0
+        # An estimate can't exceed the number of values it was counted from
+        return estimates.clip(upper=present), error
+
+    def sample(self, n: int) -> pd.DataFrame:
+        """n rows drawn uniformly from the whole file, in file order."""
+        if self._reservoir is None:
+            raise ValueError("Random rows of a streamed dataset are only available in approximate mode (send approximate=true).")
+        return self._reservoir.sample(n)
+
+    def corr(self) -> pd.DataFrame:
+        return pd.DataFrame(self._comoments.correlation(), index=self._numeric, columns=self._numeric)
+
+    def group_by(self, spec: GroupBySpec) -> Tuple[pd.DataFrame, int]:
+        """Top groups and the number of groups, computed chunk by chunk over a rescan."""
+        if self.rescan is None:
+            raise ValueError("Grouping isn't available for this dataset in streaming mode.")
+        if spec.key() not in self._groups:
+            self._groups[spec.key()] = group_chunks(self.rescan(), spec)
+        return self._groups[spec.key()]
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], **options: Any) -> StreamingProfile:
+    profile = StreamingProfile(**options)
+    for chunk in chunks:
+        profile.add(chunk)
+    return profile
+
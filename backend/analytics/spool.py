@@ -0,0 +1,167 @@
+"""
+Datasets spooled to disk by content hash, for analysis in worker processes
+"""
+
+import hashlib
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from analytics.datasets import content_id
+from analytics.formats import FORMATS
+
+DEFAULT_SPOOL_DIR = Path(__file__).resolve().parent.parent / ".cache" / "datasets"
+DATASET_ID = re.compile(r"ds_[0-9a-f]{24}")
+COPY_BYTES = 1 << 20
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class DatasetSpool:
+    """
+    One file per dataset id, named <dataset_id>.<format>, so worker
+    processes get a path instead of a pickled copy of the data. Files are
+    kept in least-recently-used order by modification time, and the oldest
+    are deleted once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, dataset_id: str, fmt: str = "csv") -> Path:
+        if not DATASET_ID.fullmatch(dataset_id):
+            raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported dataset format: {fmt!r}")
+        return self.directory / f"{dataset_id}.{fmt}"
+
+    def find(self, dataset_id: str) -> Optional[Path]:
+        """Path of a spooled dataset (marking it recently used), or None if it's gone."""
+        if not DATASET_ID.fullmatch(dataset_id or ""):
+            return None
+        for fmt in FORMATS:
+            path = self.path(dataset_id, fmt)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            return path
+        return None
+
+    def _partial(self, name: str) -> Path:
+        """A fresh file name for one write in progress; concurrent writers never share one."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f"{name}.{uuid.uuid4().hex}.part"
+
+    def _commit(self, partial: Path, dataset_id: str, fmt: str) -> Tuple[str, Path]:
+        existing = self.find(dataset_id)
+        if existing is not None:
+            partial.unlink(missing_ok=True)
+            return dataset_id, existing
+        path = self.path(dataset_id, fmt)
+        os.replace(partial, path)
+        self.prune(keep=path)
+        return dataset_id, path
+
+    def write_text(self, text: str) -> Tuple[str, Path]:
+        """Spool CSV text unless the same content already is; returns (dataset_id, path)."""
+        dataset_id = content_id(text)
+        path = self.find(dataset_id)
+        if path is not None:
+            return dataset_id, path
+        partial = self._partial(dataset_id)
+        with open(partial, "w", encoding="utf-8", newline="") as f:
+            for start in range(0, len(text), COPY_BYTES):
+                f.write(text[start:start + COPY_BYTES])
+        return self._commit(partial, dataset_id, "csv")
+
+    def writer(self, fmt: str, max_bytes: Optional[int] = None) -> "SpoolWriter":
+        """A SpoolWriter for a dataset that arrives in blocks (see SpoolWriter)."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported dataset format: {fmt!r}")
+        return SpoolWriter(self, fmt, max_bytes)
+
+    def prune(self, keep: Optional[Path] = None) -> None:
+        with self._lock:
+            files = []
+            for path in self.directory.glob("ds_*.*"):
+                if path.suffix[1:] not in FORMATS:
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+class SpoolWriter:
+    """
+    A dataset being written into the spool as it arrives, hashed and
+    size-checked block by block. `commit` files it under its content id,
+    which matches content_id() of the same CSV sent as text; `abort`
+    discards it. Methods block on disk I/O.
+    """
+
+    def __init__(self, spool: DatasetSpool, fmt: str, max_bytes: Optional[int] = None):
+        self.spool = spool
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._partial = spool._partial("upload")
+        self._file: Optional[BinaryIO] = None
+
+    def write(self, block: bytes) -> None:
+        """Append a block. Raises UploadTooLarge past `max_bytes`."""
+        self.size += len(block)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLarge(f"Dataset is larger than {self.max_bytes // (1024 * 1024)} MB")
+        if self._file is None:
+            self._file = open(self._partial, "wb")
+        self._digest.update(block)
+        self._file.write(block)
+
+    def commit(self) -> Tuple[str, Path, int]:
+        """Finish the file and return (dataset_id, path, size)."""
+        if self._file is None:
+            self._file = open(self._partial, "wb")
+        self._file.close()
+        dataset_id, path = self.spool._commit(self._partial, "ds_" + self._digest.hexdigest()[:24], self.fmt)
+        return dataset_id, path, self.size
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._partial.unlink(missing_ok=True)
+
+
+_spool: Optional[DatasetSpool] = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> DatasetSpool:
+    """Return the dataset spool; every worker process on the host shares its directory."""
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                _spool = DatasetSpool(
+                    Path(os.getenv("AGENTBAY_DATASET_SPOOL_DIR", str(DEFAULT_SPOOL_DIR))),
+                    int(os.getenv("AGENTBAY_DATASET_SPOOL_MB", "2048")) * 1024 * 1024,
+                )
+    return _spool
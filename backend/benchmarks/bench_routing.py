@@ -0,0 +1,125 @@
+"""
+Micro-benchmark for /chat intent routing
+
+Compares the compiled single-pass router with the original sequential keyword
+scans over a synthetic corpus and checks that both pick the same agent.
+
+Usage (from backend/):
+    python -m benchmarks.bench_routing [--messages 100000] [--seed 7]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.routing import AGENT_KEYWORDS, intent_router
+
+FILLER = [
+    "hey", "can", "you", "please", "tell", "me", "about", "the", "latest", "what",
+    "is", "going", "on", "with", "my", "this", "week", "today", "help", "need",
+    "quick", "question", "and", "also", "thanks", "for", "some", "good", "ideas",
+]
+
+
+def legacy_route(message: str) -> str:
+    """The original detect_intent_and_route, kept as the reference behaviour."""
+    message_lower = message.lower()
+    youtube_patterns = [r'youtube\.com/watch\?v=', r'youtu\.be/', r'youtube\.com/embed/']
+    if any(re.search(pattern, message_lower) for pattern in youtube_patterns):
+        return "YouTubeAgent"
+    if any(keyword in message_lower for keyword in ['youtube', 'video', 'analyze video']):
+        return "YouTubeAgent"
+    finance_keywords = [
+        'stock', 'price', 'share', 'market', 'crypto', 'bitcoin', 'ethereum',
+        'portfolio', 'investment', 'trading', 'finance', 'financial', 'nasdaq',
+        'dow jones', 's&p', 'ticker', 'earnings', 'dividend'
+    ]
+    if any(keyword in message_lower for keyword in finance_keywords):
+        return "FinanceAgent"
+    news_keywords = [
+        'news', 'breaking', 'current events', 'headlines', 'article',
+        'tech news', 'business news', 'sports news', 'latest news'
+    ]
+    if any(keyword in message_lower for keyword in news_keywords):
+        return "NewsAgent"
+    music_keywords = [
+        'music', 'generate music', 'create music', 'compose', 'song',
+        'melody', 'beat', 'instrumental', 'audio', 'sound'
+    ]
+    if any(keyword in message_lower for keyword in music_keywords):
+        return "MusicAgent"
+    data_keywords = [
+        'data', 'analyze', 'csv', 'dataset', 'statistics', 'correlation',
+        'data analysis', 'analyze data', 'process data'
+    ]
+    if any(keyword in message_lower for keyword in data_keywords):
+        return "DataAgent"
+    travel_keywords = [
+        'travel', 'trip', 'vacation', 'holiday', 'visit', 'itinerary',
+        'plan', 'destination', 'tour', 'explore', 'journey', 'flight',
+        'hotel', 'booking', 'sightseeing'
+    ]
+    if any(keyword in message_lower for keyword in travel_keywords):
+        return "TravelAgent"
+    return "TravelAgent"
+
+
+def build_corpus(size: int, seed: int) -> List[str]:
+    """Generate chat-like messages with zero, one or several routing keywords."""
+    rng = random.Random(seed)
+    keywords = [k for _, group in AGENT_KEYWORDS for k in group]
+    urls = ["https://www.youtube.com/watch?v=dQw4w9WgXcQ", "https://youtu.be/abc123XYZ"]
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(FILLER, k=rng.randint(4, 30))
+        for _ in range(rng.choice([0, 0, 1, 1, 1, 2, 3])):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords).upper()
+                         if rng.random() < 0.1 else rng.choice(keywords))
+        if rng.random() < 0.05:
+            words.append(rng.choice(urls))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def time_router(route, corpus: List[str]) -> float:
+    start = time.perf_counter()
+    for message in corpus:
+        route(message)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.seed)
+
+    mismatches = [m for m in corpus if legacy_route(m) != intent_router.route(m)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} routing mismatches, e.g. {mismatches[0]!r}")
+        return 1
+
+    legacy = min(time_router(legacy_route, corpus) for _ in range(args.repeat))
+    compiled = min(time_router(intent_router.route, corpus) for _ in range(args.repeat))
+    scored = min(time_router(intent_router.score, corpus) for _ in range(args.repeat))
+
+    per_msg = lambda seconds: seconds / len(corpus) * 1e6
+    print(f"Corpus: {len(corpus):,} messages (seed {args.seed}), routing identical ✅")
+    print(f"Legacy sequential scans : {legacy:.3f}s ({per_msg(legacy):.2f} µs/msg)")
+    print(f"Compiled router (route) : {compiled:.3f}s ({per_msg(compiled):.2f} µs/msg)")
+    print(f"Compiled router (score) : {scored:.3f}s ({per_msg(scored):.2f} µs/msg)")
+    print(f"Speedup (route)         : {legacy / compiled:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
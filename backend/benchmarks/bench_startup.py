@@ -0,0 +1,149 @@
+"""
+Startup-time budget benchmark for the backend
+
+Measures, each in a fresh interpreter:
+  • import time of main.py and of every agent module
+  • which heavy dependencies an import drags in
+  • time from spawning uvicorn to the first successful /health response
+
+Exits non-zero when a measurement exceeds its budget, so it can gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 5] [--max-main-import-ms 800] [--max-health-ms 3000]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    "main",
+    "agents.youtube_agent",
+    "agents.tutor_agent",
+    "agents.travel_agent",
+    "agents.finance_agent",
+    "agents.news_agent",
+    "agents.music_agent",
+    "agents.data_agent",
+]
+
+# Dependencies that must only load when an agent actually uses them
+HEAVY_MODULES = [
+    "pandas", "numpy", "yfinance", "duckduckgo_search",
+    "youtube_transcript_api", "langchain_openai", "openai",
+]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(module: str) -> Dict[str, object]:
+    """Import a module in a fresh interpreter and report time and heavy deps."""
+    env = dict(os.environ, AGENTBAY_WARM_AGENTS="0")
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    return json.loads(output)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_health(timeout: float = 60.0) -> float:
+    """Spawn uvicorn and time until /health first answers 200."""
+    port = free_port()
+    env = dict(os.environ, AGENTBAY_WARM_AGENTS="0")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before /health answered")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def median_ms(samples: List[float]) -> float:
+    return statistics.median(samples) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-main-import-ms", type=float,
+                        default=float(os.getenv("AGENTBAY_MAX_IMPORT_MS", "800")))
+    parser.add_argument("--max-health-ms", type=float,
+                        default=float(os.getenv("AGENTBAY_MAX_HEALTH_MS", "3000")))
+    args = parser.parse_args()
+
+    failures = []
+
+    print("**Import time (median of fresh interpreters)**")
+    for module in MODULES:
+        try:
+            runs = [measure_import(module) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {module}: import failed\n{e.stderr.strip()}")
+            failures.append(f"{module} failed to import")
+            continue
+        elapsed = median_ms([run["seconds"] for run in runs])
+        heavy = runs[0]["heavy"]
+        print(f"• {module:<24} {elapsed:8.1f} ms   heavy deps: {', '.join(heavy) or 'none'}")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at module level")
+        if module == "main" and elapsed > args.max_main_import_ms:
+            failures.append(f"main import {elapsed:.0f}ms > budget {args.max_main_import_ms:.0f}ms")
+
+    print("\n**Time to first /health (spawn → 200 OK)**")
+    try:
+        health = median_ms([measure_first_health() for _ in range(args.runs)])
+        print(f"• uvicorn main:app {health:8.1f} ms (budget {args.max_health_ms:.0f} ms)")
+        if health > args.max_health_ms:
+            failures.append(f"first /health {health:.0f}ms > budget {args.max_health_ms:.0f}ms")
+    except (RuntimeError, TimeoutError) as e:
+        print(f"❌ {e}")
+        failures.append(str(e))
+
+    if failures:
+        print("\n❌ Startup budget exceeded:")
+        for failure in failures:
+            print(f"• {failure}")
+        return 1
+
+    print("\n✅ Startup within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+In-process async TTL cache with single-flight loading
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from core.coalesce import SingleFlight, keyed
+
+_MISSING = object()
+
+
+class _Stale:
+    """Marks a value that is past its TTL but still inside the stale window."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+# Every named cache, so /metrics can report them all
+_caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after a per-entry TTL.
+
+    Loads are single-flight. When several coroutines miss on the same key at
+    once, only the first one starts the loader and the rest await its
+    result. The loader runs as its own task (see core.coalesce.SingleFlight),
+    so a caller that is cancelled (for example by a timeout) doesn't cancel
+    the shared fetch.
+
+    With `stale_ttl`, an expired entry can still be served for that many
+    more seconds while one background load refreshes it
+    (stale-while-revalidate).
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 1024, stale_ttl: float = 0.0):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        _caches[name] = self
+
+    def _lookup(self, key: Hashable, allow_stale: bool = False) -> Any:
+        """Return the cached value, or _MISSING. Stale values come back as _Stale."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._entries[key]
+                return _MISSING
+            if not allow_stale:
+                return _MISSING
+            value = _Stale(value)
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh cached value without loading."""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _start_load(self, keys: List[Hashable], load: Callable[[], Awaitable[Dict[Hashable, Any]]],
+                    ttl: Optional[float], cache_none: bool) -> None:
+        """Run one loader task for `keys`, caching what it returns before the waiters see it."""
+        async def load_and_store() -> Dict[Hashable, Any]:
+            values = await load()
+            for key in keys:
+                value = values.get(key)
+                if value is not None or cache_none:
+                    self.set(key, value, ttl)
+            return values
+
+        self._flights.start(keys, load_and_store)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None, cache_none: bool = False) -> Any:
+        """Return the cached value, or load it once for all concurrent callers."""
+        value = self._lookup(key, allow_stale=True)
+        if isinstance(value, _Stale):
+            self.stale_hits += 1
+            if key not in self._flights:
+                self._start_load([key], keyed(key, loader), ttl, cache_none)
+            return value.value
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if key in self._flights:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            self._start_load([key], keyed(key, loader), ttl, cache_none)
+        return await self._flights.join(key)
+
+    async def refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                      ttl: Optional[float] = None, cache_none: bool = False) -> Any:
+        """Reload a key now, joining a load that is already in flight."""
+        if key not in self._flights:
+            self._start_load([key], keyed(key, loader), ttl, cache_none)
+        return await self._flights.join(key)
+
+    async def get_many_or_load(self, keys: Iterable[Hashable],
+                               loader: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                               ttl: Optional[float] = None) -> Dict[Hashable, Any]:
+        """
+        Batched variant of get_or_load. Keys that are missing and not already
+        in flight are passed to a single loader call, which returns a dict of
+        the values it found. Keys it leaves out resolve to None and are not
+        cached.
+        """
+        results: Dict[Hashable, Any] = {}
+        missing: List[Hashable] = []
+        for key in dict.fromkeys(keys):
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                results[key] = value
+            elif key in self._flights:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if missing:
+            self._start_load(missing, lambda: loader(missing), ttl, cache_none=False)
+
+        pending = [key for key in dict.fromkeys(keys) if key not in results]
+        values = await asyncio.gather(*(self._flights.join(key) for key in pending))
+        results.update(zip(pending, values))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._flights),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters for every named cache in this process."""
+    return {name: cache.stats() for name, cache in list(_caches.items())}
@@ -0,0 +1,89 @@
+"""
+Single-flight coalescing of identical concurrent requests
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+# Every named group, so /metrics can report them all
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time. Callers that arrive while a call for
+    their key is in flight await its result (or exception) instead of
+    starting their own. Nothing is kept once the call finishes.
+
+    The call runs as its own task, so a caller that disconnects doesn't
+    cancel the work the others are waiting on. Named groups are reported
+    in /metrics; TTLCache and TranscriptStore use unnamed ones and report
+    their own counters.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        if name is not None:
+            _groups[name] = self
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def start(self, keys: Iterable[Hashable], load: Callable[[], Awaitable[Dict[Hashable, Any]]]) -> None:
+        """
+        Run `load` as its own task for keys that aren't in flight yet. It
+        returns a dict of values; each key resolves to its value (None if
+        left out), or to the load's exception.
+        """
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in keys}
+        self._inflight.update(futures)
+
+        def resolve(task: asyncio.Future) -> None:
+            for key, future in futures.items():
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result().get(key))
+                # Waiters may all have gone away; don't warn about unseen errors
+                if not future.cancelled():
+                    future.exception()
+
+        asyncio.ensure_future(load()).add_done_callback(resolve)
+
+    def join(self, key: Hashable) -> Awaitable[Any]:
+        """Await the call in flight for `key` without being able to cancel it."""
+        return asyncio.shield(self._inflight[key])
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            self.start([key], keyed(key, call))
+        return await self.join(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"inflight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+def keyed(key: Hashable, call: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Dict[Hashable, Any]]]:
+    """Adapt a single-value call to SingleFlight.start."""
+    async def load() -> Dict[Hashable, Any]:
+        return {key: await call()}
+    return load
+
+
+def coalesce_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every named single-flight group in this process."""
+    return {name: group.stats() for name, group in list(_groups.items())}
@@ -0,0 +1,82 @@
+"""
+Content-addressed response cache for agent LLM calls
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, AsyncIterator, Optional
+
+from core.cache import TTLCache
+
+_cache: Optional[TTLCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> TTLCache:
+    """The process-wide LLM response cache (TTL + LRU), shared by all agents."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(
+                    "llm_responses",
+                    ttl=float(os.getenv("AGENTBAY_LLM_CACHE_TTL", "3600")),
+                    max_entries=int(os.getenv("AGENTBAY_LLM_CACHE_MAX_ENTRIES", "1000")),
+                )
+    return _cache
+
+
+def prompt_key(model: str, temperature: Any, prompt: str) -> str:
+    """Hash of everything that determines the response."""
+    digest = hashlib.sha256()
+    for part in (model, repr(temperature), prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CachedChatModel:
+    """
+    Wraps a LangChain chat model so identical prompts are answered from cache.
+
+    Keys hash the model name, temperature and prompt, so the same transcript
+    summarised twice costs one LLM call. Concurrent identical prompts share
+    that call too. Pass `cache=False` for prompts that carry user-specific
+    context, where a shared answer would be wrong. Any other attribute is
+    passed through to the wrapped model.
+    """
+
+    def __init__(self, llm: Any, cache: Optional[TTLCache] = None):
+        self._llm = llm
+        self._cache = cache or get_llm_cache()
+        self._model = str(getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__)
+        self._temperature = getattr(llm, "temperature", None)
+
+    def _key(self, prompt: Any) -> str:
+        return prompt_key(self._model, self._temperature, str(prompt))
+
+    async def ainvoke(self, prompt: Any, cache: bool = True, **kwargs: Any) -> Any:
+        if not cache:
+            return await self._llm.ainvoke(prompt, **kwargs)
+        return await self._cache.get_or_load(self._key(prompt), lambda: self._llm.ainvoke(prompt, **kwargs))
+
+    async def astream(self, prompt: Any, cache: bool = True, **kwargs: Any) -> AsyncIterator[Any]:
+        """Stream chunks; a cached response comes back as a single chunk."""
+        if cache:
+            key = self._key(prompt)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.hits += 1
+                yield cached
+                return
+            self._cache.misses += 1
+        full = None
+        async for chunk in self._llm.astream(prompt, **kwargs):
+            full = chunk if full is None else full + chunk
+            yield chunk
+        if cache and full is not None:
+            self._cache.set(key, full)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
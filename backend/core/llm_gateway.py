@@ -0,0 +1,292 @@
+"""
+Process-wide LLM gateway: shared clients, rate limiting and fair scheduling
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Allows `per_minute` units per minute, with bursts up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+# openai errors worth retrying, matched by name so this module doesn't import openai.
+# APITimeoutError is an APIConnectionError; InternalServerError covers 5xx responses.
+TRANSIENT_ERRORS = frozenset({"APIConnectionError", "APITimeoutError", "InternalServerError"})
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection failures, timeouts and 5xx responses, which the client itself would have retried."""
+    status = getattr(error, "status_code", None)
+    return (isinstance(status, int) and status >= 500) or any(
+        cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    """
+    Every agent's LLM calls go through one gateway per process.
+
+    Before a call starts it needs a concurrency slot and room in two token
+    buckets, one for requests per minute and one for (estimated) tokens per
+    minute. Waiting calls are granted first come first served. There are no
+    priority levels: every agent call serves an interactive request, so an
+    interactive-before-background order would have nothing to reorder.
+
+    A 429 from the provider pauses all dispatch for a jittered backoff (or
+    the provider's Retry-After), and the call is retried. This way a burst
+    queues at the provider limit instead of every caller failing together.
+    Connection errors, timeouts and 5xx responses are retried with the same
+    backoff, but only delay the call that hit them.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 200000,
+                 max_concurrency: int = 32, max_retries: int = 4, completion_tokens: int = 512):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.completion_tokens = completion_tokens
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._queue: Deque[Tuple[asyncio.Future, int, float]] = deque()
+        self._active = 0
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._models: Dict[Tuple[str, float], "GatewayChatModel"] = {}
+        self._models_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.transient_errors = 0
+        self.retries = 0
+        self.granted = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def chat_model(self, model: str, temperature: float) -> "GatewayChatModel":
+        """The shared chat client for a model and temperature."""
+        with self._models_lock:
+            key = (model, temperature)
+            if key not in self._models:
+                from langchain_openai import ChatOpenAI
+                # Retries are the gateway's job (see _back_off), so the client must not retry on its own
+                llm = ChatOpenAI(model=model, temperature=temperature, max_retries=0)
+                self._models[key] = GatewayChatModel(self, llm)
+            return self._models[key]
+
+    def _estimate_tokens(self, prompt: Any) -> int:
+        return len(str(prompt)) // 4 + self.completion_tokens
+
+    # Scheduling
+
+    def _dispatch(self) -> None:
+        """Grant waiting calls, in arrival order, while slots and budget allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            future, tokens, enqueued_at = self._queue[0]
+            if future.done():  # Waiter was cancelled
+                self._queue.popleft()
+                continue
+            if self._active >= self.max_concurrency:
+                return  # _release dispatches again
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self._requests.wait_time(1, now),
+                       self._tokens.wait_time(tokens, now))
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            self._queue.popleft()
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._active += 1
+            waited = now - enqueued_at
+            self.granted += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            future.set_result(None)
+
+    async def _acquire(self, tokens: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((future, tokens, time.monotonic()))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # Granted just as the caller went away
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _retryable(self, error: Exception, attempt: int) -> bool:
+        return attempt < self.max_retries and (_is_rate_limited(error) or _is_transient(error))
+
+    def _back_off(self, attempt: int, error: Exception) -> float:
+        """
+        After a 429, pause all dispatch and return 0. After a transient
+        error, return how long this call alone should wait before retrying.
+        """
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+        self.retries += 1
+        if _is_rate_limited(error):
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            print(f"LLM rate limited; retrying in {delay:.1f}s (attempt {attempt + 1})")
+            return 0.0
+        self.transient_errors += 1
+        print(f"LLM call failed ({type(error).__name__}); retrying in {delay:.1f}s (attempt {attempt + 1})")
+        return delay
+
+    # Calls
+
+    async def run(self, call: Callable[[], Awaitable[Any]], prompt: Any) -> Any:
+        tokens = self._estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens)
+            try:
+                result = await call()
+                self.completed += 1
+                return result
+            except Exception as e:
+                if not self._retryable(e, attempt):
+                    self.failed += 1
+                    raise
+                delay = self._back_off(attempt, e)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[Any]], prompt: Any) -> AsyncIterator[Any]:
+        """Like run, but holds the slot for the whole stream. Only errors before the first chunk are retried."""
+        tokens = self._estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens)
+            started = False
+            try:
+                async for chunk in open_stream():
+                    started = True
+                    yield chunk
+                self.completed += 1
+                return
+            except Exception as e:
+                if started or not self._retryable(e, attempt):
+                    self.failed += 1
+                    raise
+                delay = self._back_off(attempt, e)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        queued = sum(1 for entry in self._queue if not entry[0].done())
+        return {
+            "queued": queued,
+            "active": self._active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "transient_errors": self.transient_errors,
+            "retries": self.retries,
+            "paused_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "queue_wait": {
+                "granted": self.granted,
+                "avg_wait_ms": round(1000 * self._wait_total / self.granted, 1) if self.granted else 0.0,
+                "max_wait_ms": round(1000 * self._wait_max, 1),
+            },
+        }
+
+
+class GatewayChatModel:
+    """
+    A shared LangChain chat model whose calls are scheduled by the gateway.
+    Any other attribute is passed through to the wrapped model.
+    """
+
+    def __init__(self, gateway: LLMGateway, llm: Any):
+        self._gateway = gateway
+        self._llm = llm
+
+    async def ainvoke(self, prompt: Any, **kwargs: Any) -> Any:
+        return await self._gateway.run(lambda: self._llm.ainvoke(prompt, **kwargs), prompt)
+
+    async def astream(self, prompt: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        async for chunk in self._gateway.stream(lambda: self._llm.astream(prompt, **kwargs), prompt):
+            yield chunk
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Return this process's gateway, with rate limits from AGENTBAY_LLM_* (one per worker, so divide provider quotas)."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(
+                    requests_per_minute=float(os.getenv("AGENTBAY_LLM_RPM", "500")),
+                    tokens_per_minute=float(os.getenv("AGENTBAY_LLM_TPM", "200000")),
+                    max_concurrency=int(os.getenv("AGENTBAY_LLM_MAX_CONCURRENCY", "32")),
+                    max_retries=int(os.getenv("AGENTBAY_LLM_MAX_RETRIES", "4")),
+                    completion_tokens=int(os.getenv("AGENTBAY_LLM_COMPLETION_TOKENS", "512")),
+                )
+    return _gateway
+
+
+def chat_model(model: str = "gpt-3.5-turbo", temperature: float = 0.7) -> GatewayChatModel:
+    """
+    Shared, gateway-scheduled chat model for agents to use. Its first call
+    imports and configures the OpenAI client, so agents call it from
+    __init__ rather than on a request; the registry builds agents off the
+    event loop.
+    """
+    return get_gateway().chat_model(model, temperature)
+
+
+def gateway_stats() -> Optional[Dict[str, Any]]:
+    """Gateway counters, or None if no agent has used the LLM yet."""
+    return _gateway.stats() if _gateway is not None else None
@@ -0,0 +1,117 @@
+"""
+Bounded per-provider thread pools for blocking I/O called from async agents
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Default concurrency caps; override with AGENTBAY_POOL_<PROVIDER>=<n>
+DEFAULT_POOL_SIZES = {
+    "yfinance": 8,
+    "duckduckgo": 4,
+    "youtube_transcript": 4,
+}
+FALLBACK_POOL_SIZE = 4
+
+
+class ProviderPool:
+    """
+    A thread pool dedicated to one upstream provider.
+
+    The pool size is the provider's concurrency cap, so a slow provider can
+    only tie up its own threads. Calls beyond the cap wait in the executor
+    queue, and the counters below expose that queue depth.
+    """
+
+    def __init__(self, provider: str, max_workers: int):
+        self.provider = provider
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=f"agentbay-{provider}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.total_wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking callable on this provider's pool and await the result."""
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def call():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait_seconds += time.perf_counter() - submitted
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+            with self._lock:
+                self.completed += 1
+            return result
+
+        def done(future):
+            # A job cancelled while still queued (its caller timed out or went away) never runs call()
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait_seconds / finished * 1000, 2) if finished else 0.0,
+            }
+
+
+_pools: Dict[str, ProviderPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(provider: str) -> ProviderPool:
+    """Return the shared pool for a provider, creating it on first use."""
+    pool = _pools.get(provider)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(provider)
+            if pool is None:
+                default = DEFAULT_POOL_SIZES.get(provider, FALLBACK_POOL_SIZE)
+                size = int(os.getenv(f"AGENTBAY_POOL_{provider.upper()}", default))
+                pool = _pools[provider] = ProviderPool(provider, max(1, size))
+    return pool
+
+
+async def run_blocking(provider: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Offload a blocking call to the provider's bounded pool."""
+    return await get_pool(provider).run(functools.partial(fn, *args, **kwargs))
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Queue depth and throughput counters for every provider pool in use."""
+    return {provider: pool.stats() for provider, pool in list(_pools.items())}
@@ -0,0 +1,173 @@
+"""
+Bounded, reusable worker processes for CPU-heavy jobs, with timeouts
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _worker_main(conn) -> None:
+    """Worker process loop: run one job at a time until the pipe closes."""
+    while True:
+        try:
+            fn, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, fn(*args, **kwargs))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            conn.send((False, RuntimeError(repr(reply[1]))))
+
+
+class _Worker:
+    def __init__(self, context):
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.recent = deque(maxlen=32)  # Affinity keys of recent jobs
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    async def call(self, fn: Callable, args: tuple, kwargs: dict, timeout: Optional[float]) -> Any:
+        """Run fn in this worker. On timeout or cancellation the worker is killed."""
+        try:
+            self._conn.send((fn, args, kwargs))
+            ok, value = await asyncio.wait_for(asyncio.to_thread(self._conn.recv), timeout)
+        except asyncio.TimeoutError:
+            self.kill()
+            raise
+        except (EOFError, OSError) as e:
+            self.kill()
+            raise RuntimeError("The worker process exited while running the job") from e
+        except BaseException:
+            self.kill()
+            raise
+        if not ok:
+            raise value
+        return value
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self._conn.close()
+
+
+class ProcessPool:
+    """
+    Up to `size` worker processes, started on first use and reused across
+    jobs. Jobs are a picklable top-level function plus small arguments;
+    large inputs should be passed as file paths. Jobs beyond `size` wait
+    for a free worker. A job with an `affinity` key prefers an idle worker
+    that recently ran a job with the same key, so per-process caches in
+    the workers get reused.
+
+    A job that times out or whose caller is cancelled is stopped by killing
+    its worker, which is replaced on the next job. Other jobs in the pool
+    are not affected.
+    """
+
+    def __init__(self, name: str, size: int, start_method: str = "spawn"):
+        self.name = name
+        self.size = size
+        self._context = multiprocessing.get_context(start_method)
+        self._idle: List[_Worker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.workers_started = 0
+
+    def _take_idle(self, affinity: Optional[str]) -> Optional[_Worker]:
+        for index in range(len(self._idle) - 1, -1, -1):
+            if affinity is not None and affinity in self._idle[index].recent:
+                return self._idle.pop(index)
+        return self._idle.pop() if self._idle else None
+
+    async def run(self, fn: Callable, *args: Any, timeout: Optional[float] = None,
+                  affinity: Optional[str] = None, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) in a worker process and await its result."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            worker = self._take_idle(affinity)
+            if worker is None or not worker.alive:
+                worker = await asyncio.to_thread(_Worker, self._context)
+                self.workers_started += 1
+            if affinity is not None and affinity not in worker.recent:
+                worker.recent.append(affinity)
+            self.active += 1
+            try:
+                result = await worker.call(fn, args, kwargs, timeout)
+                self.completed += 1
+                return result
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.active -= 1
+                if worker.alive:
+                    self._idle.append(worker)
+
+    def shutdown(self) -> None:
+        while self._idle:
+            self._idle.pop().kill()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle_workers": len(self._idle),
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "workers_started": self.workers_started,
+        }
+
+
+_pools: Dict[str, ProcessPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(name: str, size: int) -> ProcessPool:
+    """Return the shared process pool with this name, creating it on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                start_method = os.getenv("AGENTBAY_PROCESS_START_METHOD", "spawn")
+                pool = _pools[name] = ProcessPool(name, max(1, size), start_method)
+    return pool
+
+
+def process_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Job and worker counters for every process pool in use."""
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
+
+def shutdown_process_pools() -> None:
+    """Stop all idle worker processes."""
+    for pool in list(_pools.values()):
+        pool.shutdown()
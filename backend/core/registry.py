@@ -0,0 +1,97 @@
+"""
+Agent registry with lazy instantiation
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class AgentSpec:
+    """Factory and public metadata for one agent."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], info: Dict[str, Any]):
+        self.name = name
+        self.factory = factory
+        self.info = info
+        self.instance: Optional[Any] = None
+        self.build_seconds: Optional[float] = None
+        self.background_started = False
+        self.lock = threading.Lock()
+
+
+class AgentRegistry:
+    """
+    Maps agent names to factories and builds each agent on first use.
+
+    Factories import their agent module themselves, so nothing heavy is loaded
+    until an agent is needed. Builds run in a worker thread when requested
+    from the event loop, and `warm_up` builds everything in the background.
+    Agents that define `start_background_tasks()` have it called once, on
+    the event loop, after they are built.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, AgentSpec] = {}
+
+    def register(self, agent: str, factory: Callable[[], Any], **info: Any) -> None:
+        """Register an agent factory along with its /agents metadata."""
+        self._specs[agent] = AgentSpec(agent, factory, info)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def get(self, name: str) -> Any:
+        """Return the agent instance, building it synchronously if needed."""
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown agent: {name}")
+        if spec.instance is None:
+            with spec.lock:
+                if spec.instance is None:
+                    start = time.perf_counter()
+                    spec.instance = spec.factory()
+                    spec.build_seconds = time.perf_counter() - start
+                    print(f"Initialized {name} in {spec.build_seconds * 1000:.0f}ms")
+        return spec.instance
+
+    async def aget(self, name: str) -> Any:
+        """Return the agent instance without blocking the event loop on a cold build."""
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown agent: {name}")
+        instance = spec.instance
+        if instance is None:
+            instance = await asyncio.to_thread(self.get, name)
+        if not spec.background_started:
+            spec.background_started = True
+            start = getattr(instance, "start_background_tasks", None)
+            if start is not None:
+                start()
+        return instance
+
+    async def warm_up(self) -> None:
+        """Build every registered agent in a worker thread, one after another."""
+        for name in self._specs:
+            try:
+                await self.aget(name)
+            except Exception as e:
+                print(f"Failed to warm up {name}: {str(e)}")
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Metadata for every registered agent, in registration order."""
+        return [dict(spec.info) for spec in self._specs.values()]
+
+    def status(self) -> Dict[str, Any]:
+        """Which agents are built and how long each build took."""
+        return {
+            name: {
+                "loaded": spec.instance is not None,
+                "build_ms": round(spec.build_seconds * 1000, 1) if spec.build_seconds is not None else None,
+            }
+            for name, spec in self._specs.items()
+        }
@@ -0,0 +1,184 @@
+"""
+Lexical retrieval over chunked transcripts (BM25, computed with NumPy)
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from core.text import chunk_text
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Question and request words that say nothing about what to look for
+STOP_WORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being between both but by
+can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our out over own same she should so some such than that the their them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with
+would you your yours
+video transcript tell explain please quiz questions question make create give me doubt clarify confused
+understand mean means meant talk talks talked say says said mention mentioned
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of chunks.
+
+    The per-chunk term weights are computed once and stored as postings:
+    for each term, the chunks it occurs in and its weight there. Memory
+    grows with the number of (chunk, term) pairs rather than with
+    chunks x vocabulary, and scoring a query adds up the postings of its
+    terms.
+    """
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        import numpy as np
+
+        self.chunks = chunks
+        vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for i, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            lengths[i] = len(tokens)
+            for token in tokens:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+        self.vocabulary = vocabulary
+
+        # One entry per distinct (term, chunk) pair, sorted by term then chunk
+        stride = max(len(chunks), 1)
+        pairs, tf = np.unique(np.asarray(cols, dtype=np.int64) * stride + np.asarray(rows, dtype=np.int64),
+                              return_counts=True)
+        pair_rows, pair_cols = pairs % stride, pairs // stride
+        df = np.bincount(pair_cols, minlength=len(vocabulary))
+        idf = np.log1p((len(chunks) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        average = lengths.mean() if len(chunks) else 0.0
+        norm = k1 * (1 - b + b * lengths / average) if average else np.full(len(chunks), k1, dtype=np.float32)
+        tf = tf.astype(np.float32)
+        self._rows = pair_rows.astype(np.int32)
+        self._weights = (idf[pair_cols] * tf * (k1 + 1) / (tf + norm[pair_rows])).astype(np.float32)
+        self._offsets = np.concatenate([[0], np.cumsum(df)])
+
+        self.nbytes = (self._rows.nbytes + self._weights.nbytes + self._offsets.nbytes
+                       + sum(sys.getsizeof(chunk) for chunk in chunks)
+                       + sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) + 28 for term in vocabulary))
+
+    def scores(self, query: str):
+        """BM25 score of every chunk for the query, as a float32 array."""
+        import numpy as np
+
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)) - STOP_WORDS:
+            column = self.vocabulary.get(term)
+            if column is not None:
+                start, end = self._offsets[column], self._offsets[column + 1]
+                scores[self._rows[start:end]] += self._weights[start:end]
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[int]:
+        """Indices of the k best chunks for the query, best first. Empty if nothing matches."""
+        import numpy as np
+
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        return matched[np.argsort(-scores[matched], kind="stable")].tolist()
+
+
+class TranscriptRetriever:
+    """
+    Chunks and indexes each transcript once, then picks the passages a
+    prompt needs under a character budget.
+
+    Indexes are kept in a small LRU keyed by a hash of the transcript text,
+    so follow-up questions about the same video reuse the index. The LRU is
+    bounded by both the number of indexes and their total size; an index
+    bigger than the whole budget is used but not kept.
+    """
+
+    def __init__(self, chunk_chars: int = 800, overlap_chars: int = 150, max_indexes: int = 64,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.chunk_chars = chunk_chars
+        self.overlap_chars = overlap_chars
+        self.max_indexes = max_indexes
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def index_for(self, transcript: str) -> BM25Index:
+        key = hashlib.sha1(transcript.encode("utf-8")).hexdigest()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = BM25Index(chunk_text(transcript, self.chunk_chars, self.overlap_chars))
+        if index.nbytes > self.max_bytes:
+            return index
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = index
+                self._bytes += index.nbytes
+            while len(self._indexes) > self.max_indexes or self._bytes > self.max_bytes:
+                _, evicted = self._indexes.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return index
+
+    def context(self, transcript: str, query: str, budget_chars: int) -> str:
+        """
+        Transcript passages relevant to the query, in the order they occur in
+        the video, joined with "..." and kept within budget_chars. Short
+        transcripts are returned whole. When no chunk matches the query,
+        chunks spread evenly across the video are used instead.
+        """
+        import numpy as np
+
+        if len(transcript) <= budget_chars:
+            return transcript
+        index = self.index_for(transcript)
+        k = max(1, budget_chars // self.chunk_chars)
+        picked = index.top_k(query, k)
+        if not picked:
+            picked = np.linspace(0, len(index.chunks) - 1, num=min(k, len(index.chunks))).round().astype(int).tolist()
+        selected, used = [], 0
+        for i in picked:
+            size = len(index.chunks[i]) + 5
+            if used + size > budget_chars and selected:
+                continue
+            selected.append(i)
+            used += size
+        return "\n...\n".join(index.chunks[i] for i in sorted(set(selected)))
+
+
+_retriever: Optional[TranscriptRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> TranscriptRetriever:
+    """Return the shared retriever, whose BM25 indexes are reused across questions about the same video."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = TranscriptRetriever(
+                    chunk_chars=int(os.getenv("AGENTBAY_RETRIEVAL_CHUNK_CHARS", "800")),
+                    overlap_chars=int(os.getenv("AGENTBAY_RETRIEVAL_OVERLAP_CHARS", "150")),
+                    max_bytes=int(os.getenv("AGENTBAY_RETRIEVAL_CACHE_MB", "64")) * 1024 * 1024,
+                )
+    return _retriever
+
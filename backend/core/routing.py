@@ -0,0 +1,121 @@
+"""
+Compiled intent router for the /chat endpoint
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Agents in priority order. The first agent with any hit wins, exactly like the
+# original chain of `any(keyword in message_lower ...)` checks. Keywords are
+# plain substrings, YouTube URL fragments included.
+AGENT_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("YouTubeAgent", [
+        'youtube.com/watch?v=', 'youtu.be/', 'youtube.com/embed/',
+        'youtube', 'video', 'analyze video'
+    ]),
+    ("FinanceAgent", [
+        'stock', 'price', 'share', 'market', 'crypto', 'bitcoin', 'ethereum',
+        'portfolio', 'investment', 'trading', 'finance', 'financial', 'nasdaq',
+        'dow jones', 's&p', 'ticker', 'earnings', 'dividend'
+    ]),
+    ("NewsAgent", [
+        'news', 'breaking', 'current events', 'headlines', 'article',
+        'tech news', 'business news', 'sports news', 'latest news'
+    ]),
+    ("MusicAgent", [
+        'music', 'generate music', 'create music', 'compose', 'song',
+        'melody', 'beat', 'instrumental', 'audio', 'sound'
+    ]),
+    ("DataAgent", [
+        'data', 'analyze', 'csv', 'dataset', 'statistics', 'correlation',
+        'data analysis', 'analyze data', 'process data'
+    ]),
+    ("TravelAgent", [
+        'travel', 'trip', 'vacation', 'holiday', 'visit', 'itinerary',
+        'plan', 'destination', 'tour', 'explore', 'journey', 'flight',
+        'hotel', 'booking', 'sightseeing'
+    ]),
+]
+
+DEFAULT_AGENT = "TravelAgent"
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Build a prefix-trie alternation that prefers the longest keyword."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """
+    Routes a message to an agent with one precompiled keyword automaton.
+
+    All keywords are folded into a single trie-shaped regex, so each position
+    of the message is checked against every keyword at once. The regex takes
+    the longest keyword at a position, and every shorter keyword starting
+    there is a prefix of it, so the best agent for each possible match is
+    precomputed. Scanning restarts one character after each match start,
+    which keeps overlapping keywords visible and the priority order identical
+    to the old sequential scans.
+    """
+
+    def __init__(self, agent_keywords: List[Tuple[str, List[str]]] = AGENT_KEYWORDS,
+                 default_agent: str = DEFAULT_AGENT):
+        self.default_agent = default_agent
+        self._agents = [agent for agent, _ in agent_keywords]
+
+        priorities: Dict[str, int] = {}
+        for priority, (_, keywords) in enumerate(agent_keywords):
+            for keyword in keywords:
+                priorities.setdefault(keyword.lower(), priority)
+
+        # Best (lowest) priority among all keywords that start where this one does
+        self._best = {
+            keyword: min(p for other, p in priorities.items() if keyword.startswith(other))
+            for keyword in priorities
+        }
+        self._pattern = re.compile(_trie_pattern(priorities))
+
+    def _hits(self, message_lower: str) -> Iterator[int]:
+        """Yield the winning priority for every position where a keyword starts."""
+        match = self._pattern.search(message_lower)
+        while match:
+            yield self._best[match.group()]
+            match = self._pattern.search(message_lower, match.start() + 1)
+
+    def score(self, message: str) -> Dict[str, int]:
+        """Count keyword hits per agent in a single pass over the message."""
+        scores = {agent: 0 for agent in self._agents}
+        for priority in self._hits(message.lower()):
+            scores[self._agents[priority]] += 1
+        return scores
+
+    def first_hit(self, message: str) -> Optional[str]:
+        """Return the highest-priority agent with at least one hit, or None."""
+        best = None
+        for priority in self._hits(message.lower()):
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return self._agents[best] if best is not None else None
+
+    def route(self, message: str) -> str:
+        """Route a message to an agent name, falling back to the default agent."""
+        return self.first_hit(message) or self.default_agent
+
+
+intent_router = IntentRouter()
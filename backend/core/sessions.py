@@ -0,0 +1,76 @@
+"""
+Bounded per-session state with idle-timeout eviction
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+# Used when a client sends no session id (older clients share one context)
+DEFAULT_SESSION = "default"
+
+# Every named store, so /metrics can report them all
+_stores: Dict[str, "SessionStore"] = {}
+
+
+class SessionStore:
+    """
+    Maps a session id to one value, such as a session's active video.
+
+    Sessions are kept in least-recently-used order. Every lookup or update
+    moves the session to the back, so idle sessions collect at the front
+    and are dropped from there. Each access checks only the front, which
+    keeps lookups O(1). At most `max_sessions` are kept; beyond that the
+    least recently used is evicted even if it is not idle yet.
+    """
+
+    def __init__(self, name: str, idle_timeout: float = 1800.0, max_sessions: int = 10000):
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evictions = 0
+        _stores[name] = self
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            _, last_seen = next(iter(self._sessions.values()))
+            if last_seen + self.idle_timeout > now:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def get(self, session_id: Hashable, default: Any = None) -> Any:
+        """The session's value, or default if it has none or has gone idle."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return default
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def set(self, session_id: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._sessions[session_id] = (value, now)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"sessions": len(self._sessions), "expired": self.expired, "evictions": self.evictions}
+
+
+def session_stats() -> Dict[str, Dict[str, Any]]:
+    """Session counts for every named store in this process."""
+    return {name: store.stats() for name, store in list(_stores.items())}
@@ -0,0 +1,67 @@
+"""
+Map-reduce summarization for transcripts longer than one prompt
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, List, Optional
+
+from core.text import chunk_text
+
+
+class MapReduceSummarizer:
+    """
+    Splits a long transcript into segments and summarizes them concurrently,
+    at most `max_concurrency` calls at a time. The caller merges the partial
+    summaries with one final prompt of its own.
+
+    Segment prompts depend only on the segment text and its position, so
+    with a CachedChatModel a re-summarize of the same transcript is served
+    from cache.
+    """
+
+    def __init__(self, segment_chars: int = 4000, max_concurrency: int = 6):
+        self.segment_chars = segment_chars
+        self.max_concurrency = max_concurrency
+
+    def needs_map(self, transcript: str) -> bool:
+        return len(transcript) > self.segment_chars
+
+    def _segment_prompt(self, segment: str, number: int, total: int) -> str:
+        return f"""Summarize part {number} of {total} of a video transcript.
+Use concise bullet points. Keep names, numbers, definitions and conclusions.
+Do not add an introduction or mention that this is a part.
+
+Transcript part:
+{segment}
+"""
+
+    async def summarize_segments(self, llm: Any, transcript: str) -> List[str]:
+        """Partial summaries, one per segment, in transcript order."""
+        segments = chunk_text(transcript, self.segment_chars, 0)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize(number: int, segment: str) -> str:
+            async with semaphore:
+                response = await llm.ainvoke(self._segment_prompt(segment, number, len(segments)))
+                return response.content
+
+        return await asyncio.gather(*(summarize(i, s) for i, s in enumerate(segments, start=1)))
+
+
+_summarizer: Optional[MapReduceSummarizer] = None
+_summarizer_lock = threading.Lock()
+
+
+def get_summarizer() -> MapReduceSummarizer:
+    """Return the shared summarizer; AGENTBAY_SUMMARY_* set its segment size and concurrency."""
+    global _summarizer
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = MapReduceSummarizer(
+                    segment_chars=int(os.getenv("AGENTBAY_SUMMARY_SEGMENT_CHARS", "4000")),
+                    max_concurrency=int(os.getenv("AGENTBAY_SUMMARY_CONCURRENCY", "6")),
+                )
+    return _summarizer
@@ -0,0 +1,27 @@
+"""
+Plain-text helpers shared by transcript retrieval and summarization
+"""
+
+from typing import List
+
+
+def chunk_text(text: str, chunk_chars: int, overlap_chars: int) -> List[str]:
+    """Split text into chunks of about chunk_chars, breaking on whitespace, with some overlap."""
+    words = text.split()
+    chunks: List[str] = []
+    start = 0
+    while start < len(words):
+        size, end = 0, start
+        while end < len(words) and (size == 0 or size + len(words[end]) + 1 <= chunk_chars):
+            size += len(words[end]) + 1
+            end += 1
+        chunks.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+        # Step back far enough to repeat about overlap_chars of context
+        back, kept = end, 0
+        while back > start + 1 and kept < overlap_chars:
+            back -= 1
+            kept += len(words[back]) + 1
+        start = back
+    return chunks
@@ -0,0 +1,177 @@
+"""
+Persistent, size-bounded transcript store shared by the video agents
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.coalesce import SingleFlight
+from core.offload import run_blocking
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / ".cache" / "transcripts.sqlite3"
+
+
+class TranscriptStore:
+    """
+    Transcripts keyed by video_id, in two tiers.
+
+    The memory tier is an LRU bounded by the UTF-8 size of the transcripts
+    it holds. The disk tier is a SQLite database in WAL mode, so every
+    worker process on the host shares it and it survives restarts. It is
+    capped at a number of entries and drops the least recently fetched.
+    Concurrent misses for one video share a single upstream fetch.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH, max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_disk_entries: int = 5000):
+        self.db_path = Path(db_path)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        self._fetches = SingleFlight()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Disk tier (blocking; run through the transcript_store pool)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS transcripts (
+                video_id TEXT PRIMARY KEY,
+                transcript TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS transcripts_fetched_at ON transcripts (fetched_at)")
+            self._local.conn = conn
+        return conn
+
+    def _load_from_disk(self, video_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT transcript FROM transcripts WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _save_to_disk(self, video_id: str, transcript: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (video_id, transcript, fetched_at) VALUES (?, ?, ?)",
+                (video_id, transcript, time.time())
+            )
+            conn.execute(
+                """DELETE FROM transcripts WHERE video_id NOT IN (
+                    SELECT video_id FROM transcripts ORDER BY fetched_at DESC LIMIT ?
+                )""",
+                (self.max_disk_entries,)
+            )
+
+    # Memory tier
+
+    def _remember(self, video_id: str, transcript: str) -> None:
+        size = len(transcript.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        with self._memory_lock:
+            previous = self._memory.pop(video_id, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous.encode("utf-8"))
+            self._memory[video_id] = transcript
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.encode("utf-8"))
+                self.evictions += 1
+
+    def get_cached(self, video_id: str) -> Optional[str]:
+        """Memory-tier lookup only; never blocks."""
+        with self._memory_lock:
+            transcript = self._memory.get(video_id)
+            if transcript is not None:
+                self._memory.move_to_end(video_id)
+            return transcript
+
+    async def get_or_fetch(self, video_id: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Return the transcript from memory, then disk, then `fetch`. Fetched
+        transcripts are written to both tiers. A None result is not stored.
+
+        The lookup runs in its own task that every caller awaits, so a
+        caller that goes away doesn't cancel it for the others.
+        """
+        transcript = self.get_cached(video_id)
+        if transcript is not None:
+            self.memory_hits += 1
+            return transcript
+        return await self._fetches.do(video_id, lambda: self._load_or_fetch(video_id, fetch))
+
+    async def _load_or_fetch(self, video_id: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        try:
+            transcript = await run_blocking("transcript_store", self._load_from_disk, video_id)
+        except sqlite3.Error as e:
+            print(f"Transcript store read failed: {str(e)}")
+            transcript = None
+        if transcript is not None:
+            self.disk_hits += 1
+            self._remember(video_id, transcript)
+            return transcript
+
+        self.misses += 1
+        transcript = await fetch()
+        if transcript:
+            self._remember(video_id, transcript)
+            try:
+                await run_blocking("transcript_store", self._save_to_disk, video_id, transcript)
+            except sqlite3.Error as e:
+                print(f"Transcript store write failed: {str(e)}")
+        return transcript
+
+    def stats(self) -> Dict[str, Any]:
+        with self._memory_lock:
+            entries, size = len(self._memory), self._memory_bytes
+        return {
+            "memory_entries": entries,
+            "memory_bytes": size,
+            "max_memory_bytes": self.max_memory_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self._fetches.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+_store: Optional[TranscriptStore] = None
+_store_lock = threading.Lock()
+
+
+def get_transcript_store() -> TranscriptStore:
+    """Return the transcript store shared by YouTubeAgent and TutorAgent, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TranscriptStore(
+                    db_path=Path(os.getenv("AGENTBAY_TRANSCRIPT_DB", str(DEFAULT_DB_PATH))),
+                    max_memory_bytes=int(os.getenv("AGENTBAY_TRANSCRIPT_MEMORY_MB", "64")) * 1024 * 1024,
+                    max_disk_entries=int(os.getenv("AGENTBAY_TRANSCRIPT_DB_MAX_ENTRIES", "5000")),
+                )
+    return _store
+
+
+def transcript_store_stats() -> Optional[Dict[str, Any]]:
+    """Store counters, or None if no agent has used the store yet."""
+    return _store.stats() if _store is not None else None
@@ -0,0 +1,121 @@
+"""
+Streaming multipart/form-data parsing for large file uploads
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from core.offload import run_blocking
+
+# Text fields are small; anything bigger is a malformed or hostile request
+MAX_FIELD_BYTES = 64 * 1024
+# File bytes are handed to the sink in blocks of about this size
+WRITE_BYTES = 1 << 20
+
+
+class UploadError(ValueError):
+    """The request body isn't a well-formed multipart upload."""
+
+
+class Upload:
+    """Text fields of a multipart request, and the sink its file part went to (None if it had none)."""
+
+    def __init__(self, fields: Dict[str, str], filename: Optional[str], content_type: Optional[str], sink: Any):
+        self.fields = fields
+        self.filename = filename
+        self.content_type = content_type
+        self.sink = sink
+
+
+async def read_upload(request: Any, open_sink: Callable[[str, Optional[str]], Any], pool: str) -> Upload:
+    """
+    Parse a multipart/form-data request body as it arrives.
+
+    Starlette's own form parsing copies every file part to a temporary file
+    before the endpoint runs. Here the single file part is passed straight
+    to the sink returned by `open_sink(filename, content_type)`, so it is
+    written once, where it belongs, and the sink can reject it early (for
+    instance by size). The sink needs `write(bytes)` and `abort()`; writes
+    run on the `pool` thread pool in blocks of about WRITE_BYTES. On any
+    error the sink is aborted.
+    """
+    try:
+        from python_multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:  # python-multipart < 0.0.13
+        from multipart.multipart import MultipartParser, parse_options_header
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadError("Expected a multipart/form-data body")
+
+    fields: Dict[str, str] = {}
+    upload = Upload(fields, None, None, None)
+    part: Dict[str, Any] = {}
+    pending: List[bytes] = []
+
+    def on_part_begin() -> None:
+        part.clear()
+        part.update(headers={}, name=b"", value=b"", data=bytearray(), is_file=False)
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        part["name"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        part["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        part["headers"][part["name"].lower()] = part["value"]
+        part["name"], part["value"] = b"", b""
+
+    def on_headers_finished() -> None:
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        if b"name" not in disposition:
+            raise UploadError('Every part needs a Content-Disposition header with a "name"')
+        part["field"] = disposition[b"name"].decode("utf-8", "replace")
+        if b"filename" in disposition:
+            if upload.sink is not None:
+                raise UploadError("Only one file can be uploaded at a time")
+            upload.filename = disposition[b"filename"].decode("utf-8", "replace")
+            part_type = part["headers"].get(b"content-type")
+            upload.content_type = part_type.decode("latin-1") if part_type else None
+            upload.sink = open_sink(upload.filename, upload.content_type)
+            part["is_file"] = True
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if part["is_file"]:
+            pending.append(data[start:end])
+        else:
+            part["data"] += data[start:end]
+            if len(part["data"]) > MAX_FIELD_BYTES:
+                raise UploadError(f"Form field {part['field']!r} is larger than {MAX_FIELD_BYTES // 1024} KB")
+
+    def on_part_end() -> None:
+        if not part["is_file"]:
+            fields[part["field"]] = part["data"].decode("utf-8", "replace")
+
+    async def flush() -> None:
+        block = b"".join(pending)
+        pending.clear()
+        if block:
+            await run_blocking(pool, upload.sink.write, block)
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if sum(map(len, pending)) >= WRITE_BYTES:
+                await flush()
+        parser.finalize()
+        await flush()
+    except BaseException:
+        if upload.sink is not None:
+            await run_blocking(pool, upload.sink.abort)
+        raise
+    return upload
@@ -1,18 +1,25 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
-from agents.youtube_agent import YouTubeAgent
-from agents.travel_agent import TravelAgent
-from agents.finance_agent import FinanceAgent
-from agents.news_agent import NewsAgent
-from agents.music_agent import MusicAgent
-from agents.data_agent import DataAgent
+from typing import Dict, Any, Optional, AsyncIterator
+from analytics.formats import FORMATS, detect_format
+from analytics.spool import UploadTooLarge, get_spool
+from core.cache import cache_stats
+from core.coalesce import SingleFlight, coalesce_stats
+from core.llm_gateway import gateway_stats
+from core.offload import pool_stats, run_blocking
+from core.process_pool import process_pool_stats, shutdown_process_pools
+from core.registry import AgentRegistry
+from core.transcripts import transcript_store_stats
+from core.uploads import UploadError, read_upload
+from core.routing import intent_router
+from core.sessions import session_stats
 import asyncio
+import json
 import os
 from dotenv import load_dotenv
 import traceback
-import re
 
 load_dotenv()
 
@@ -27,119 +34,154 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize all agents
-youtube_agent = YouTubeAgent()
-travel_agent = TravelAgent()
-finance_agent = FinanceAgent()
-news_agent = NewsAgent()
-music_agent = MusicAgent()
-data_agent = DataAgent()
+# Agent factories - each imports its module on first use so a cold worker
+# starts serving without loading every agent's dependencies
+def _youtube_agent():
+    from agents.youtube_agent import YouTubeAgent
+    return YouTubeAgent()
+
+def _travel_agent():
+    from agents.travel_agent import TravelAgent
+    return TravelAgent()
+
+def _finance_agent():
+    from agents.finance_agent import FinanceAgent
+    return FinanceAgent()
+
+def _news_agent():
+    from agents.news_agent import NewsAgent
+    return NewsAgent()
+
+def _music_agent():
+    from agents.music_agent import MusicAgent
+    return MusicAgent()
+
+def _data_agent():
+    from agents.data_agent import DataAgent
+    return DataAgent()
+
+agent_registry = AgentRegistry()
+agent_registry.register(
+    "YouTubeAgent", _youtube_agent,
+    id="youtube-agent",
+    name="YouTube Assistant",
+    description="Analyzes YouTube videos, provides summaries, generates quizzes, and answers questions about video content",
+    tools=["video_analysis", "quiz_generation", "question_answering", "doubt_clarification"]
+)
+agent_registry.register(
+    "TravelAgent", _travel_agent,
+    id="travel-agent",
+    name="Travel Planner",
+    description="Creates personalized travel itineraries, researches destinations, and provides travel advice",
+    tools=["destination_research", "itinerary_planning", "budget_estimation", "travel_tips"]
+)
+agent_registry.register(
+    "FinanceAgent", _finance_agent,
+    id="finance-agent",
+    name="Finance Assistant",
+    description="Provides stock prices, market analysis, crypto data, and financial insights",
+    tools=["stock_prices", "market_analysis", "crypto_data", "portfolio_analysis"]
+)
+agent_registry.register(
+    "NewsAgent", _news_agent,
+    id="news-agent",
+    name="News Assistant",
+    description="Searches for news articles, breaking news, and current events across various topics",
+    tools=["news_search", "breaking_news", "topic_analysis", "news_summary"]
+)
+agent_registry.register(
+    "MusicAgent", _music_agent,
+    id="music-agent",
+    name="Music Generator",
+    description="Generates custom music using AI, creates compositions in various genres and styles",
+    tools=["music_generation", "composition", "genre_creation", "audio_processing"]
+)
+agent_registry.register(
+    "DataAgent", _data_agent,
+    id="data-agent",
+    name="Data Analyst",
+    description="Analyzes data, processes CSV files, provides statistical insights and data visualizations",
+    tools=["data_analysis", "csv_processing", "statistics", "data_insights"]
+)
+
+_background_tasks = set()
+
+@app.on_event("startup")
+async def warm_agents():
+    """Build agents in the background once the server is up (AGENTBAY_WARM_AGENTS=0 disables)."""
+    if os.getenv("AGENTBAY_WARM_AGENTS", "1") == "0":
+        return
+    task = asyncio.create_task(agent_registry.warm_up())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+@app.on_event("shutdown")
+def stop_worker_processes():
+    """Stop the analysis worker processes with the server."""
+    shutdown_process_pools()
 
 class ChatRequest(BaseModel):
     agent: str
     input: Dict[str, Any]
+    session_id: Optional[str] = None  # Keeps per-conversation agent context apart
 
 class ChatResponse(BaseModel):
     message: str
     type: Optional[str] = None
     source: Optional[str] = None
+    dataset_id: Optional[str] = None  # Send back instead of csv_data for follow-up questions
 
-def detect_intent_and_route(message: str) -> str:
-    """Detect user intent and route to appropriate agent."""
-    message_lower = message.lower()
-    
-    # YouTube detection
-    youtube_patterns = [
-        r'youtube\.com/watch\?v=',
-        r'youtu\.be/',
-        r'youtube\.com/embed/',
-    ]
-    
-    if any(re.search(pattern, message_lower) for pattern in youtube_patterns):
-        return "YouTubeAgent"
-    
-    if any(keyword in message_lower for keyword in ['youtube', 'video', 'analyze video']):
-        return "YouTubeAgent"
-    
-    # Finance detection
-    finance_keywords = [
-        'stock', 'price', 'share', 'market', 'crypto', 'bitcoin', 'ethereum',
-        'portfolio', 'investment', 'trading', 'finance', 'financial', 'nasdaq',
-        'dow jones', 's&p', 'ticker', 'earnings', 'dividend'
-    ]
-    
-    if any(keyword in message_lower for keyword in finance_keywords):
-        return "FinanceAgent"
-    
-    # News detection
-    news_keywords = [
-        'news', 'breaking', 'current events', 'headlines', 'article',
-        'tech news', 'business news', 'sports news', 'latest news'
-    ]
-    
-    if any(keyword in message_lower for keyword in news_keywords):
-        return "NewsAgent"
-    
-    # Music detection
-    music_keywords = [
-        'music', 'generate music', 'create music', 'compose', 'song',
-        'melody', 'beat', 'instrumental', 'audio', 'sound'
-    ]
-    
-    if any(keyword in message_lower for keyword in music_keywords):
-        return "MusicAgent"
-    
-    # Data analysis detection
-    data_keywords = [
-        'data', 'analyze', 'csv', 'dataset', 'statistics', 'correlation',
-        'data analysis', 'analyze data', 'process data'
-    ]
-    
-    if any(keyword in message_lower for keyword in data_keywords):
+# Identical concurrent /chat requests share one agent call (AGENTBAY_COALESCE_CHAT=0 disables)
+_chat_flights = SingleFlight("chat") if os.getenv("AGENTBAY_COALESCE_CHAT", "1") != "0" else None
+
+def _coalesce_key(agent_name: str, agent: Any, input_data: Dict[str, Any]) -> Optional[tuple]:
+    """
+    Key under which identical requests may share one result, or None when
+    this request must run on its own. Agents whose answer depends on more
+    than the message (session state, attached data) opt out by defining
+    shares_results(input_data) and returning False.
+    """
+    shares_results = getattr(agent, "shares_results", None)
+    if shares_results is not None and not shares_results(input_data):
+        return None
+    return agent_name, " ".join(input_data["message"].split())
+
+async def _run_agent(agent_name: str, agent: Any, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    key = _coalesce_key(agent_name, agent, input_data) if _chat_flights is not None else None
+    if key is None:
+        return await agent.run_tool(input_data)
+    return await _chat_flights.do(key, lambda: agent.run_tool(input_data))
+
+def detect_intent_and_route(message: str, input_data: Optional[Dict[str, Any]] = None) -> str:
+    """Detect user intent and route to appropriate agent. Requests that carry a dataset go to DataAgent."""
+    if input_data and (input_data.get("csv_data") or input_data.get("dataset_id")):
         return "DataAgent"
-    
-    # Travel detection
-    travel_keywords = [
-        'travel', 'trip', 'vacation', 'holiday', 'visit', 'itinerary',
-        'plan', 'destination', 'tour', 'explore', 'journey', 'flight',
-        'hotel', 'booking', 'sightseeing'
-    ]
-    
-    if any(keyword in message_lower for keyword in travel_keywords):
-        return "TravelAgent"
-    
-    # Default to travel agent for general queries
-    return "TravelAgent"
+    return intent_router.route(message)
+
+def _agent_input(request: ChatRequest, message: str) -> Dict[str, Any]:
+    """Everything the client sent (message, csv_data, ...) plus the session id."""
+    return {**request.input, "message": message, "session_id": request.session_id}
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """Main chat endpoint with intelligent routing."""
     try:
-        print(f"Received chat request: {request}")
+        print(f"Received chat request: agent={request.agent} message={request.input.get('message', '')!r}")
         
         message = request.input.get("message", "")
         if not message:
             raise HTTPException(status_code=400, detail="Message is required")
         
         # Auto-detect the appropriate agent
-        detected_agent = detect_intent_and_route(message)
+        input_data = _agent_input(request, message)
+        detected_agent = detect_intent_and_route(message, input_data)
         print(f"Auto-detected agent: {detected_agent} for message: {message}")
         
         # Route to appropriate agent
-        if detected_agent == "YouTubeAgent":
-            result = await youtube_agent.run_tool({"message": message})
-        elif detected_agent == "TravelAgent":
-            result = await travel_agent.run_tool({"message": message})
-        elif detected_agent == "FinanceAgent":
-            result = await finance_agent.run_tool({"message": message})
-        elif detected_agent == "NewsAgent":
-            result = await news_agent.run_tool({"message": message})
-        elif detected_agent == "MusicAgent":
-            result = await music_agent.run_tool({"message": message})
-        elif detected_agent == "DataAgent":
-            result = await data_agent.run_tool({"message": message})
-        else:
+        if detected_agent not in agent_registry:
             raise HTTPException(status_code=400, detail=f"Unknown agent: {detected_agent}")
+        agent = await agent_registry.aget(detected_agent)
+        result = await _run_agent(detected_agent, agent, input_data)
         
         if result.get("type") == "error":
             print(f"{detected_agent} error: {result['content']}")
@@ -152,7 +194,8 @@ async def chat_endpoint(request: ChatRequest):
         return ChatResponse(
             message=result["content"],
             type=result["type"],
-            source=result["source"]
+            source=result["source"],
+            dataset_id=result.get("dataset_id")
         )
             
     except HTTPException:
@@ -162,57 +205,167 @@ async def chat_endpoint(request: ChatRequest):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+class DatasetResponse(BaseModel):
+    dataset_id: str
+    format: str
+    bytes: int
+    message: Optional[str] = None  # Answer to the message sent with the upload, if any
+    type: Optional[str] = None
+    source: Optional[str] = None
+
+_max_upload_bytes = int(os.getenv("AGENTBAY_UPLOAD_MAX_MB", "1024")) * 1024 * 1024
+# Room for the text fields and multipart framing around the file itself
+_upload_form_slack = 1024 * 1024
+
+_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "message": {"type": "string"},
+                "session_id": {"type": "string"},
+                "approximate": {"type": "boolean"},
+            },
+        }}},
+    },
+}
+
+def _open_dataset_sink(filename: str, content_type: Optional[str]):
+    fmt = detect_format(filename, content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported dataset file; expected one of {', '.join(FORMATS)}")
+    return get_spool().writer(fmt, _max_upload_bytes)
+
+@app.post("/datasets", response_model=DatasetResponse, openapi_extra=_UPLOAD_SCHEMA)
+async def upload_dataset(request: Request):
+    """
+    Upload a dataset (CSV, Parquet or JSON Lines) as the multipart field
+    `file`, with optional `message`, `session_id` and `approximate` fields.
+    The body is parsed as it arrives and the file's raw bytes go straight
+    into the dataset spool, undecoded; a body whose Content-Length is over
+    the limit is refused before any of it is read. Send the returned
+    dataset_id to /chat to ask about it. A message sent with the upload is
+    answered right away, from sketches if `approximate` is set.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > _max_upload_bytes + _upload_form_slack:
+        raise HTTPException(status_code=413, detail=f"Dataset is larger than {_max_upload_bytes // (1024 * 1024)} MB")
+    try:
+        upload = await read_upload(request, _open_dataset_sink, "dataset_spool")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if upload.sink is None:
+        raise HTTPException(status_code=400, detail="No dataset file in the upload (expected a multipart field named 'file')")
+    try:
+        dataset_id, _, size = await run_blocking("dataset_spool", upload.sink.commit)
+    except Exception as e:
+        await run_blocking("dataset_spool", upload.sink.abort)
+        print(f"Saving dataset upload {upload.filename!r} failed: {e}")
+        raise HTTPException(status_code=500, detail="The dataset couldn't be saved. Please try again.")
+    fmt = upload.sink.fmt
+    print(f"Received dataset upload: {upload.filename!r} ({fmt}, {size} bytes) -> {dataset_id}")
+
+    response = DatasetResponse(dataset_id=dataset_id, format=fmt, bytes=size)
+    message = upload.fields.get("message", "")
+    approximate = upload.fields.get("approximate")
+    if approximate is not None:
+        approximate = approximate.strip().lower() in ("1", "true", "yes", "on")
+    if message:
+        agent = await agent_registry.aget("DataAgent")
+        result = await _run_agent("DataAgent", agent, {"message": message, "dataset_id": dataset_id,
+                                                       "session_id": upload.fields.get("session_id") or None,
+                                                       "approximate": approximate})
+        response.message, response.type, response.source = result["content"], result["type"], result["source"]
+    return response
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_agent_events(agent_name: str, agent: Any, input_data: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Turn an agent's output into SSE: `token` events while the LLM is writing,
+    then one `done` event with type and source. Agents without stream_tool
+    produce a single `done` event that also carries the message.
+    """
+    try:
+        if hasattr(agent, "stream_tool"):
+            results = agent.stream_tool(input_data)
+        else:
+            async def single_result():
+                yield await agent.run_tool(input_data)
+            results = single_result()
+
+        async for item in results:
+            if isinstance(item, str):
+                yield _sse("token", {"token": item})
+                continue
+            final = {key: value for key, value in item.items() if key != "content"}
+            if "content" in item:
+                final["message"] = item["content"]
+            if item.get("type") == "error":
+                print(f"{agent_name} error: {item.get('content')}")
+            yield _sse("done", final)
+    except Exception as e:
+        print(f"Unexpected streaming error: {str(e)}")
+        print(traceback.format_exc())
+        yield _sse("done", {"message": f"Internal server error: {str(e)}", "type": "error", "source": agent_name})
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Streaming chat endpoint (Server-Sent Events) with intelligent routing."""
+    print(f"Received streaming chat request: agent={request.agent} message={request.input.get('message', '')!r}")
+    
+    message = request.input.get("message", "")
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is required")
+    
+    input_data = _agent_input(request, message)
+    detected_agent = detect_intent_and_route(message, input_data)
+    print(f"Auto-detected agent: {detected_agent} for message: {message}")
+    
+    if detected_agent not in agent_registry:
+        raise HTTPException(status_code=400, detail=f"Unknown agent: {detected_agent}")
+    agent = await agent_registry.aget(detected_agent)
+    
+    return StreamingResponse(
+        _stream_agent_events(detected_agent, agent, input_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/agents")
 async def get_agents():
     """Get list of available agents."""
-    return [
-        {
-            "id": "youtube-agent",
-            "name": "YouTube Assistant",
-            "description": "Analyzes YouTube videos, provides summaries, generates quizzes, and answers questions about video content",
-            "tools": ["video_analysis", "quiz_generation", "question_answering", "doubt_clarification"]
-        },
-        {
-            "id": "travel-agent",
-            "name": "Travel Planner",
-            "description": "Creates personalized travel itineraries, researches destinations, and provides travel advice",
-            "tools": ["destination_research", "itinerary_planning", "budget_estimation", "travel_tips"]
-        },
-        {
-            "id": "finance-agent",
-            "name": "Finance Assistant",
-            "description": "Provides stock prices, market analysis, crypto data, and financial insights",
-            "tools": ["stock_prices", "market_analysis", "crypto_data", "portfolio_analysis"]
-        },
-        {
-            "id": "news-agent",
-            "name": "News Assistant",
-            "description": "Searches for news articles, breaking news, and current events across various topics",
-            "tools": ["news_search", "breaking_news", "topic_analysis", "news_summary"]
-        },
-        {
-            "id": "music-agent",
-            "name": "Music Generator",
-            "description": "Generates custom music using AI, creates compositions in various genres and styles",
-            "tools": ["music_generation", "composition", "genre_creation", "audio_processing"]
-        },
-        {
-            "id": "data-agent",
-            "name": "Data Analyst",
-            "description": "Analyzes data, processes CSV files, provides statistical insights and data visualizations",
-            "tools": ["data_analysis", "csv_processing", "statistics", "data_insights"]
-        }
-    ]
+    return agent_registry.describe()
 
 @app.get("/credits")
 async def get_credits():
     """Get user credits (mock implementation)."""
     return {"credits": 1000}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics for the worker's shared resources."""
+    return {
+        "provider_pools": pool_stats(),
+        "process_pools": process_pool_stats(),
+        "caches": cache_stats(),
+        "transcript_store": transcript_store_stats(),
+        "sessions": session_stats(),
+        "llm_gateway": gateway_stats(),
+        "coalesced_requests": coalesce_stats()
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "message": "AgentBay API is running with all agents"}
+    return {"status": "healthy", "message": "AgentBay API is running with all agents", "agents": agent_registry.status()}
 
 if __name__ == "__main__":
     import uvicorn
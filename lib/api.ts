@@ -50,9 +50,14 @@ const mockDelay = (ms = 1000) => new Promise((resolve) => setTimeout(resolve, ms
 
 class ApiClient {
   private baseURL: string
+  // Lets the backend keep per-conversation context (e.g. the active video) apart
+  private sessionId: string
 
   constructor(baseURL: string) {
     this.baseURL = baseURL
+    this.sessionId = typeof crypto !== "undefined" && "randomUUID" in crypto
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`
   }
 
   private async request<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
@@ -287,6 +292,7 @@ class ApiClient {
       body: JSON.stringify({
         agent: agentName,
         input,
+        session_id: this.sessionId,
       }),
     })
   }
@@ -304,6 +310,27 @@ class ApiClient {
     return this.uploadRequest<Array<{ name: string; url: string }>>("/upload", formData)
   }
 
+  // Sends a CSV, Parquet or JSONL file as-is; ask about it later by passing dataset_id in the chat input
+  async uploadDataset(file: File, message?: string, approximate?: boolean) {
+    if (IS_DEV_MODE) {
+      await mockDelay(1500)
+      return { dataset_id: `mock-${file.name}`, format: "csv", bytes: file.size }
+    }
+    const formData = new FormData()
+    formData.append("file", file)
+    if (message) formData.append("message", message)
+    if (approximate !== undefined) formData.append("approximate", String(approximate))
+    formData.append("session_id", this.sessionId)
+    return this.uploadRequest<{
+      dataset_id: string
+      format: string
+      bytes: number
+      message?: string
+      type?: string
+      source?: string
+    }>("/datasets", formData)
+  }
+
   // Voice endpoints
   async transcribe(audioBlob: Blob) {
     if (IS_DEV_MODE) {
@@ -359,6 +386,7 @@ export const chatApi = {
 
 export const fileApi = {
   uploadFiles: apiClient.uploadFiles.bind(apiClient),
+  uploadDataset: apiClient.uploadDataset.bind(apiClient),
 }
 
 export const voiceApi = {